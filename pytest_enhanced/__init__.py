@@ -3,6 +3,9 @@ pytest-enhanced
 Pytest analytics: flaky tests, slow tests, historical pass rate.
 """
 
+from .storage import ensure_db, record_test_result
+from .analysis import get_session_stats, get_flaky_tests, get_slowest_tests
+
 __all__ = [
     "ensure_db",
     "record_test_result",
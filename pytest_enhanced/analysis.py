@@ -1,12 +1,14 @@
 from __future__ import annotations
 
+import functools
 from typing import Dict, List, Tuple, Optional
 
 from .storage import (
+    data_stamp,
     fetch_last_run_id,
-    fetch_run_summary,
+    fetch_latest_summary,
     fetch_slowest_tests,
-    fetch_flaky_tests,
+    fetch_flaky_stats,
     fetch_pass_rate_history,
 )
 
@@ -15,10 +17,13 @@ def get_session_stats() -> Optional[Dict]:
     """
     Fetches and calculates session statistics based on the latest test run.
 
-    This function retrieves the latest run ID and fetches associated data to
-    compile session statistics. The statistics include summary details, pass
-    rate, a list of the slowest tests, flaky test information, and pass rate
-    history.
+    This function retrieves the latest run ID together with its result summary in a
+    single query and compiles session statistics from it. The statistics include
+    summary details, pass rate, a list of the slowest tests, flaky test information,
+    and pass rate history. Results are memoized per ``storage.data_stamp``, so
+    repeated calls only cost the stamp lookup until the database changes, whichever
+    process changes it. Every call returns its own copy of the memoized statistics,
+    so a caller modifying the result cannot change what later callers get.
 
     :raises KeyError: Raised if any expected key is missing in the fetched data.
 
@@ -26,40 +31,65 @@ def get_session_stats() -> Optional[Dict]:
         is available.
     :rtype: Optional[Dict]
     """
-    run_id = fetch_last_run_id()
-    if run_id is None:
+    stats = _compute_session_stats(data_stamp())
+    if stats is None:
         return None
+    # the lists hold tuples, so copying the containers is enough
+    return {
+        **stats,
+        "summary": dict(stats["summary"]),
+        "slow_tests": list(stats["slow_tests"]),
+        "flaky_tests": list(stats["flaky_tests"]),
+        "history": list(stats["history"]),
+    }
+
 
-    summary = fetch_run_summary(run_id)
-    total = summary["total"] or 1  # avoid div by zero
-    pass_rate = (summary["passed"] / total) * 100.0
+@functools.lru_cache(maxsize=8)
+def _compute_session_stats(stamp: Tuple) -> Optional[Dict]:
+    """
+    Computes the session statistics for the latest run. The result is cached, so the
+    underlying database queries run only once per database state.
+
+    :param stamp: The database state, as returned by ``data_stamp``; the cache key,
+        which is also passed on to the memoized storage reads.
+    :type stamp: Tuple
+    :return: A dictionary containing the run ID, summary, pass rate, slowest tests,
+        flaky tests and pass rate history, or None if no run has been recorded.
+    :rtype: Optional[Dict]
+    """
+    latest = fetch_latest_summary()
+    if latest is None:
+        return None
+    run_id = latest["run_id"]
+    summary = {key: latest[key] for key in ("total", "passed", "failed", "skipped")}
 
-    slow = fetch_slowest_tests(run_id, limit=5)
-    flaky = fetch_flaky_tests(window=20, min_failures=2)
+    slow = fetch_slowest_tests(run_id, limit=5, stamp=stamp)
+    flaky = fetch_flaky_stats(min_failures=2)
     hist = fetch_pass_rate_history(limit=10)
 
     return {
         "run_id": run_id,
         "summary": summary,
-        "pass_rate": pass_rate,
+        "pass_rate": latest["pass_rate"],
         "slow_tests": slow,
         "flaky_tests": flaky,
         "history": hist,
     }
 
 
-def get_flaky_tests() -> List[Tuple[str, int, int]]:
+def get_flaky_tests() -> List[Tuple[str, int, int, int, float]]:
     """
     Retrieves a list of tests identified as flaky. Flaky tests are tests that do not
     consistently pass and may fail intermittently due to reasons other than code
-    issues. The fetch operation uses configurable criteria, such as the window
-    size and minimum failures.
+    issues. The figures are read from the per-test stats that are precomputed
+    over the last 20 runs whenever a run finishes.
 
     :return: A list of tuples where each tuple contains the test name (str), the
-        number of failures (int), and the failure window (int).
-    :rtype: List[Tuple[str, int, int]]
+        number of failures (int), the failure window (int), the number of
+        pass/fail flips (int), and the instability percentage (float).
+    :rtype: List[Tuple[str, int, int, int, float]]
     """
-    return fetch_flaky_tests(window=20, min_failures=2)
+    return fetch_flaky_stats(min_failures=2)
 
 
 def get_slowest_tests() -> List[Tuple[str, float]]:
@@ -6,18 +6,42 @@ slow test analysis, and data export.
 """
 
 from __future__ import annotations
-import typer, json, csv
+import typer, csv, functools
 from pathlib import Path
-from typing import Optional
-from rich.console import Console
+from typing import TYPE_CHECKING, Optional
 from .analysis import get_session_stats, get_flaky_tests, get_slowest_tests
-from .report import render_full_report
-from .storage import fetch_all_runs, fetch_tests_for_run
-from .utils import format_duration
-from .web.server import run_server
+from .storage import EXPORT_FIELDS, ensure_db, fetch_export_rows, fetch_last_run_id
+from .utils import dumps_json
+
+if TYPE_CHECKING:
+    from rich.console import Console
 
 app = typer.Typer(help="pytest-enhanced: analyze pytest stability and performance")
-console = Console()
+
+
+@functools.cache
+def _console() -> Console:
+    """
+    Returns the shared Rich console, creating it on first use. Rich, the report
+    renderer and the web server are imported inside the commands that need them,
+    so starting the CLI only pays for the modules of the invoked command.
+
+    :return: The console used for all CLI output.
+    :rtype: Console
+    """
+    from rich.console import Console
+    return Console()
+
+
+@app.callback()
+def main():
+    """
+    Prepares the results database before any command runs, creating missing tables
+    and indexes so that commands work against databases written by older versions.
+
+    :return: None
+    """
+    ensure_db()
 
 
 @app.command()
@@ -36,8 +60,10 @@ def report():
     """
     stats = get_session_stats()
     if stats is None:
-        console.print("[red]No test runs found.[/red] Run pytest with [bold]--enhanced[/bold].")
+        _console().print("[red]No test runs found.[/red] Run pytest with [bold]--enhanced[/bold].")
         raise typer.Exit(1)
+
+    from .report import render_full_report
     render_full_report(stats)
 
 
@@ -52,27 +78,19 @@ def flaky():
     Raises an exit code using `typer.Exit` if no flaky tests are found.
 
     :param flakes: List of tuples where each tuple contains the test name (str),
-        the number of failed runs (int), and the total runs (int). Derived from the
-        `get_flaky_tests` logic.
+        the number of failed runs (int), the total runs (int), the number of
+        outcome flips (int) and the instability percentage (float). Derived from
+        the `get_flaky_tests` logic.
     :raises typer.Exit: Exits the application with an appropriate message if no flaky
         tests are found.
     """
     flakes = get_flaky_tests()
     if not flakes:
-        console.print("[green]No flaky tests found (>=2 fails in last 20 runs).[/green]")
+        _console().print("[green]No flaky tests found (>=2 fails in last 20 runs).[/green]")
         raise typer.Exit()
 
-    from rich.table import Table
-    table = Table(title="🔥 Flaky tests", title_style="red", box=None)
-    table.add_column("Test name", style="bold")
-    table.add_column("Fails", justify="right")
-    table.add_column("Total runs", justify="right")
-    table.add_column("Instability %", justify="right")
-
-    for name, fails, total in flakes:
-        pct = (fails / total * 100.0) if total else 0.0
-        table.add_row(name, str(fails), str(total), f"{pct:.1f}%")
-    console.print(table)
+    from .report import flaky_table
+    _console().print(flaky_table(flakes))
 
 
 @app.command()
@@ -93,17 +111,11 @@ def slow():
     """
     slows = get_slowest_tests()
     if not slows:
-        console.print("[yellow]No slow tests recorded.[/yellow]")
+        _console().print("[yellow]No slow tests recorded.[/yellow]")
         raise typer.Exit()
 
-    from rich.table import Table
-    table = Table(title="🐢 Slowest tests", title_style="yellow", box=None)
-    table.add_column("Test name", style="bold")
-    table.add_column("Duration", justify="right")
-
-    for name, dur in slows:
-        table.add_row(name, format_duration(dur))
-    console.print(table)
+    from .report import slowest_table
+    _console().print(slowest_table(slows))
 
 
 @app.command()
@@ -116,9 +128,10 @@ def export(
     Exports test results from a database in a specified format (csv or json).
 
     This method retrieves a specific number of the most recent test runs and their
-    associated test data from the database, formats the data, and saves it to an
-    output file. If no output path is provided, a default filename with the
-    appropriate extension will be used.
+    associated test data from the database with a single query and streams them to
+    an output file row by row, so memory use does not grow with the size of the
+    export. If no output path is provided, a default filename with the appropriate
+    extension will be used.
 
     :param format: The export format, either "csv" or "json".
     :param output: The path to the output file where the results will be saved.
@@ -126,60 +139,55 @@ def export(
     :param limit: The number of recent test runs to include in the export.
     :return: None
     """
-    runs = fetch_all_runs(limit=limit)
-    if not runs:
+    format = format.lower()
+    if format not in ("csv", "json"):
+        typer.echo("❌ Unsupported format. Use --format csv or --format json.")
+        raise typer.Exit(1)
+
+    if fetch_last_run_id() is None:
         typer.echo("No test runs found in database.")
         raise typer.Exit(0)
 
-    all_data = []
-    for run in runs:
-        run_id = run["run_id"]
-        tests = fetch_tests_for_run(run_id)
-        for t in tests:
-            all_data.append({
-                "run_id": run_id,
-                "started_at": run["started_at"],
-                "finished_at": run.get("finished_at", ""),
-                "test_name": t["test_name"],
-                "status": t["status"],
-                "duration": t["duration"],
-                "error_message": t["error_message"] or "",
-            })
-
     if not output:
-        output = Path(f"pytest_enhanced_export.{format.lower()}")
-    format = format.lower()
+        output = Path(f"pytest_enhanced_export.{format}")
 
+    count = 0
     if format == "json":
-        with open(output, "w", encoding="utf-8") as f:
-            json.dump(all_data, f, indent=2)
-    elif format == "csv":
-        keys = all_data[0].keys()
-        with open(output, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=keys)
-            writer.writeheader()
-            writer.writerows(all_data)
+        with open(output, "wb") as f:
+            f.write(b"[")
+            for row in fetch_export_rows(limit=limit):
+                f.write(b",\n  " if count else b"\n  ")
+                f.write(dumps_json(dict(zip(EXPORT_FIELDS, row))))
+                count += 1
+            f.write(b"\n]\n" if count else b"]\n")
     else:
-        typer.echo("❌ Unsupported format. Use --format csv or --format json.")
-        raise typer.Exit(1)
+        with open(output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_FIELDS)
+            for row in fetch_export_rows(limit=limit):
+                writer.writerow(row)
+                count += 1
 
-    typer.echo(f"✅ Exported {len(all_data)} test results to {output}")
+    typer.echo(f"✅ Exported {count} test results to {output}")
 
 
 @app.command()
 def web(
         host: str = typer.Option("127.0.0.1", help="Host to bind the web server."),
-        port: int = typer.Option(8000, help="Port for the web server.")
+        port: int = typer.Option(8000, help="Port for the web server."),
+        workers: int = typer.Option(1, min=1, help="Number of web server worker processes."),
 ):
     """
-    Starts a web server with specified host and port options.
+    Starts a web server with specified host, port and worker options.
 
     :param host: The host address to bind the web server, default is "127.0.0.1".
     :param port: The port number for the web server, default is 8000.
+    :param workers: The number of worker processes, default is 1.
     :return: None
     """
+    from .web.server import run_server
     typer.echo(f"🌐 Starting web dashboard at http://{host}:{port}")
-    run_server(host=host, port=port)
+    run_server(host=host, port=port, workers=workers)
 
 @app.command()
 def html(output: Optional[Path] = typer.Option(None, "--output", "-o", help="Output HTML file path")):
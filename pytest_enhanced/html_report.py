@@ -5,7 +5,7 @@ from datetime import datetime
 from typing import Optional
 
 from .analysis import get_session_stats
-from .utils import format_duration
+from .utils import format_duration, format_percent
 
 
 def export_html_report(output_path: Optional[Path | str] = None) -> None:
@@ -38,7 +38,7 @@ def export_html_report(output_path: Optional[Path | str] = None) -> None:
     passed = summary["passed"]
     failed = summary["failed"]
     skipped = summary["skipped"]
-    pass_rate = f"{stats['pass_rate']:.1f}%"
+    pass_rate = format_percent(stats["pass_rate"])
 
     # HTML Structure
     html = f"""<!DOCTYPE html>
@@ -133,10 +133,15 @@ h1, h2 {{
 <h2>🔥 Flaky Tests</h2>
 """
     if flaky:
-        html += '<table class="table"><tr><th>Test Name</th><th>Fails</th><th>Total Runs</th><th>Instability %</th></tr>'
-        for name, fails, total_runs in flaky:
-            pct = (fails / total_runs * 100.0) if total_runs else 0.0
-            html += f"<tr><td>{name}</td><td>{fails}</td><td>{total_runs}</td><td>{pct:.1f}%</td></tr>"
+        html += (
+            '<table class="table"><tr><th>Test Name</th><th>Fails</th><th>Total Runs</th>'
+            '<th>Flips</th><th>Instability %</th></tr>'
+        )
+        for name, fails, total_runs, flips, pct in flaky:
+            html += (
+                f"<tr><td>{name}</td><td>{fails}</td><td>{total_runs}</td>"
+                f"<td>{flips}</td><td>{pct:.1f}%</td></tr>"
+            )
         html += "</table>"
     else:
         html += "<p>No flaky tests detected (min 2 fails in last 20 runs).</p>"
@@ -1,10 +1,92 @@
 from __future__ import annotations
 import pytest
 from typing import Optional
-from .storage import ensure_db, start_run, finish_run, record_test_result
+from .storage import close_connection, ensure_db, start_run, finish_run, record_test_result
 
-# Глобален идентификатор на текущия run
-CURRENT_RUN_ID: Optional[int] = None
+
+class EnhancedRecorder:
+    """
+    Records the results of one pytest session into the pytest-enhanced database.
+
+    An instance is registered as a plugin by ``pytest_configure`` when the
+    `--enhanced` flag is given and is reachable through ``config.stash[RECORDER_KEY]``.
+    Keeping the run ID on the instance instead of in a module global ties it to a
+    single pytest config. Under pytest-xdist the recorder
+    only lives on the controller process: workers forward their reports to it, so
+    the whole distributed session is recorded as one run by one writer.
+    """
+
+    def __init__(self) -> None:
+        self.run_id: Optional[int] = None
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_sessionstart(self, session):
+        """
+        This hook implementation is executed at the beginning of a test session. It
+        ensures the database setup is complete and starts a new test run, keeping its
+        identifier on the recorder. The connection opened here is cached by the storage
+        layer and reused by every later hook of the session; ``pytest_unconfigure``
+        closes it.
+
+        :param session: An instance of a pytest Session object representing the current test
+                        session.
+        """
+        ensure_db()
+        self.run_id = start_run()
+
+    @pytest.hookimpl()
+    def pytest_runtest_logreport(self, report: pytest.TestReport):
+        """
+        Process a test log report and record the result, including status, duration,
+        and optional error message for a specific test. This hook is intended to
+        handle and process the log report generated during the `pytest` test execution.
+
+        The function evaluates the status of the test (e.g., passed, failed, skipped),
+        extracts necessary information, and records it if a test run ID is active. The
+        storage layer buffers the results and writes them in batches. It ignores setup
+        and teardown steps, processing only the `call` phase of the test.
+
+        :param report: The test report object from `pytest`, which contains information
+            about the executed test, including the node identifier, duration, and
+            potential errors.
+        :return: None
+        """
+        if self.run_id is None:
+            return
+        if report.when != "call":
+            return
+
+        # outcome is "passed", "failed" or "skipped"; passed is by far the most
+        # common one and needs no error text
+        status = report.outcome
+        if status == "passed":
+            err = None
+        elif report.longrepr:
+            err = report.longreprtext[:500]
+        else:
+            err = "Unknown failure" if status == "failed" else None
+
+        record_test_result(self.run_id, report.nodeid, status, report.duration, err)
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_sessionfinish(self, session, exitstatus):
+        """
+        This function is executed at the very end of a pytest session. It ensures cleanup tasks
+        are performed by concluding and resetting any currently active test run, which
+        also flushes the buffered results.
+
+        :param session: Provides information about the pytest session object.
+        :type session: _pytest.main.Session
+        :param exitstatus: An integer representing the exit status/result of the pytest session.
+        :type exitstatus: int
+        :return: None
+        """
+        if self.run_id is not None:
+            finish_run(self.run_id)
+            self.run_id = None
+
+
+RECORDER_KEY = pytest.StashKey[EnhancedRecorder]()
 
 
 def pytest_addoption(parser):
@@ -29,84 +111,36 @@ def pytest_addoption(parser):
     )
 
 
-@pytest.hookimpl(tryfirst=True)
-def pytest_sessionstart(session):
-    """
-    This hook implementation is executed at the beginning of a test session. It initializes
-    a global run identifier for the current session. If the `--enhanced` CLI option is
-    enabled, it ensures the database setup is complete and starts a new test run, setting
-    its identifier globally. If the option is not enabled, no test run ID is set.
-
-    :param session: An instance of a pytest Session object representing the current test
-                    session.
+def pytest_configure(config):
     """
-    global CURRENT_RUN_ID
-    config = session.config
-    if config.getoption("--enhanced"):
-        ensure_db()
-        CURRENT_RUN_ID = start_run()
-    else:
-        CURRENT_RUN_ID = None
-
+    Registers an ``EnhancedRecorder`` for this config when the `--enhanced` option is
+    enabled. pytest-xdist workers are skipped, since their reports are replayed on the
+    controller, which records them.
 
-@pytest.hookimpl()
-def pytest_runtest_logreport(report: pytest.TestReport):
-    """
-    Process a test log report and record the result, including status, duration,
-    and optional error message for a specific test. This hook is intended to
-    handle and process the log report generated during the `pytest` test execution.
-
-    The function evaluates the status of the test (e.g., passed, failed, skipped),
-    extracts necessary information, and records it using the `record_test_result`
-    function if a test run ID is active. It ignores setup and teardown steps,
-    processing only the `call` phase of the test.
-
-    :param report: The test report object from `pytest`, which contains information
-        about the executed test, including the node identifier, duration, and
-        potential errors.
+    :param config: The pytest config object.
+    :type config: pytest.Config
     :return: None
     """
-    global CURRENT_RUN_ID
-    if CURRENT_RUN_ID is None:
+    if not config.getoption("--enhanced"):
         return
-    if report.when != "call":
+    if hasattr(config, "workerinput"):
         return
-
-    test_name = report.nodeid
-    duration = getattr(report, "duration", 0.0)
-
-    if report.failed:
-        status = "failed"
-        err = str(report.longrepr)[:500] if report.longrepr else "Unknown failure"
-    elif report.skipped:
-        status = "skipped"
-        err = str(report.longrepr)[:500] if report.longrepr else None
-    else:
-        status = "passed"
-        err = None
-
-    record_test_result(
-        run_id=CURRENT_RUN_ID,
-        test_name=test_name,
-        status=status,
-        duration=duration,
-        error_message=err,
-    )
+    recorder = EnhancedRecorder()
+    config.stash[RECORDER_KEY] = recorder
+    config.pluginmanager.register(recorder, "pytest-enhanced-recorder")
 
 
-@pytest.hookimpl(trylast=True)
-def pytest_sessionfinish(session, exitstatus):
+def pytest_unconfigure(config):
     """
-    This function is executed at the very end of a pytest session. It ensures cleanup tasks
-    are performed by concluding and resetting any currently active test run.
+    Unregisters the recorder created by ``pytest_configure``, if any, and closes the
+    database connection its session shared.
 
-    :param session: Provides information about the pytest session object.
-    :type session: _pytest.main.Session
-    :param exitstatus: An integer representing the exit status/result of the pytest session.
-    :type exitstatus: int
+    :param config: The pytest config object.
+    :type config: pytest.Config
     :return: None
     """
-    global CURRENT_RUN_ID
-    if CURRENT_RUN_ID is not None:
-        finish_run(CURRENT_RUN_ID)
-        CURRENT_RUN_ID = None
+    recorder = config.stash.get(RECORDER_KEY, None)
+    if recorder is not None:
+        del config.stash[RECORDER_KEY]
+        config.pluginmanager.unregister(recorder)
+        close_connection()
@@ -1,19 +1,40 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
-from rich.console import Console
+from rich.console import Console, JustifyMethod
 from rich.table import Table
 from rich.panel import Panel
 from rich.text import Text
 
-from .utils import format_duration
+from .utils import format_duration, format_percent
 
 
 console = Console()
 
-
-def _render_header(run_id: int, pass_rate: float, summary: Dict[str, int]) -> None:
+# Column layouts of the shared tables as (header, justify, style). Tables are built
+# fresh on every call: a Rich Table keeps its rows inside its column objects, so a
+# cached template would have to be deep-copied, which costs more than building it.
+SLOWEST_COLUMNS: Tuple[Tuple[str, JustifyMethod, Optional[str]], ...] = (
+    ("Test name", "left", "bold"),
+    ("Duration", "right", None),
+)
+FLAKY_COLUMNS: Tuple[Tuple[str, JustifyMethod, Optional[str]], ...] = (
+    ("Test name", "left", "bold"),
+    ("Fails", "right", None),
+    ("Total runs", "right", None),
+    ("Flips", "right", None),
+    ("Instability %", "right", None),
+)
+
+# Trend blocks indexed by "pass rate >= 90%": index 0 is red, index 1 is green
+TREND_BLOCKS = ("🟥", "🟩")
+
+# Upper bound for per-run lines under the trend line; older runs are summarized
+MAX_HISTORY_DETAILS = 30
+
+
+def _render_header(run_id: int, pass_rate: Optional[float], summary: Dict[str, int]) -> None:
     """
     Generates and renders a header section for a pytest enhanced report. This header
     includes information such as the run ID, total number of tests, the count of tests
@@ -22,8 +43,9 @@ def _render_header(run_id: int, pass_rate: float, summary: Dict[str, int]) -> No
 
     :param run_id: The unique identifier for the test run.
     :type run_id: int
-    :param pass_rate: The percentage of tests that passed in the run.
-    :type pass_rate: float
+    :param pass_rate: The percentage of tests that passed in the run, or None if the
+        run has no results.
+    :type pass_rate: Optional[float]
     :param summary: A dictionary containing the summary of test results. Expected
         keys are "total", "passed", "failed", and "skipped".
     :type summary: Dict[str, int]
@@ -42,18 +64,62 @@ def _render_header(run_id: int, pass_rate: float, summary: Dict[str, int]) -> No
     header_text.append("──────────────────────────────────────────\n", style="dim")
     header_text.append(f"Total tests: {total}\n", style="bold")
     header_text.append(f"Passed: {passed}  |  Failed: {failed}  |  Skipped: {skipped}\n")
-    header_text.append(f"Pass rate: {pass_rate:.1f}%\n")
+    header_text.append(f"Pass rate: {format_percent(pass_rate)}\n")
 
     console.print(Panel(header_text, expand=False, border_style="magenta"))
 
 
+def slowest_table(slow_tests: List[Tuple[str, float]]) -> Table:
+    """
+    Builds the table of the slowest tests shared by the full report and the `slow`
+    CLI command.
+
+    :param slow_tests: A list of tuples where each tuple contains the name of the
+        test as a string and its duration in seconds as a float.
+    :return: A Rich table with one row per test.
+    :rtype: Table
+    """
+    table = Table(title="🐢 Slowest tests", title_style="yellow", expand=False, box=None)
+    for header, justify, style in SLOWEST_COLUMNS:
+        table.add_column(header, justify=justify, style=style)
+
+    for test_name, dur in slow_tests:
+        table.add_row(test_name, format_duration(dur))
+
+    return table
+
+
+def flaky_table(flaky_tests: List[Tuple[str, int, int, int, float]]) -> Table:
+    """
+    Builds the table of flaky tests shared by the full report and the `flaky` CLI
+    command.
+
+    :param flaky_tests: A list of tuples where each tuple contains:
+                        - Test name (str): Name of the test
+                        - Fails (int): Number of test failures
+                        - Total (int): Total number of test runs
+                        - Flips (int): Number of outcome changes between runs
+                        - Instability (float): Percentage of failed runs
+    :return: A Rich table with one row per test.
+    :rtype: Table
+    """
+    table = Table(title="🔥 Flaky tests", title_style="red", expand=False, box=None)
+    for header, justify, style in FLAKY_COLUMNS:
+        table.add_column(header, justify=justify, style=style)
+
+    for test_name, fails, total, flips, instability in flaky_tests:
+        table.add_row(test_name, str(fails), str(total), str(flips), f"{instability:.1f}%")
+
+    return table
+
+
 def _render_slowest(slow_tests: List[Tuple[str, float]]) -> None:
     """
-    Renders a panel or table displaying the slowest tests and their average durations.
+    Renders a panel or table displaying the slowest tests and their durations.
     If no slow tests are recorded, a message panel is displayed instead.
 
     :param slow_tests: A list of tuples where each tuple contains the name of the
-        test as a string and its average duration as a float.
+        test as a string and its duration as a float.
     :return: This function does not return a value. It performs operations that
         print content to the console.
     """
@@ -61,25 +127,15 @@ def _render_slowest(slow_tests: List[Tuple[str, float]]) -> None:
         console.print(Panel("No slow tests recorded.", title="🐢 Slowest tests", border_style="yellow"))
         return
 
-    table = Table(title="🐢 Slowest tests", title_style="yellow", expand=False, box=None)
-    table.add_column("Test name", style="bold")
-    table.add_column("Avg duration", justify="right")
-
-    for test_name, dur in slow_tests:
-        table.add_row(test_name, format_duration(dur))
-
-    console.print(table)
+    console.print(slowest_table(slow_tests))
 
 
-def _render_flaky(flaky_tests: List[Tuple[str, int, int]]) -> None:
+def _render_flaky(flaky_tests: List[Tuple[str, int, int, int, float]]) -> None:
     """
     Renders a report for flaky tests in a formatted table. If the list of flaky tests
     is empty, a message indicating no flaky tests detected is displayed instead.
 
-    :param flaky_tests: A list of tuples where each tuple contains:
-                        - Test name (str): Name of the test
-                        - Fails (int): Number of test failures
-                        - Total (int): Total number of test runs
+    :param flaky_tests: A list of flaky test tuples as accepted by ``flaky_table``.
     :return: None
     """
     if not flaky_tests:
@@ -87,17 +143,7 @@ def _render_flaky(flaky_tests: List[Tuple[str, int, int]]) -> None:
                             title="🔥 Flaky tests", border_style="red"))
         return
 
-    table = Table(title="🔥 Flaky tests", title_style="red", expand=False, box=None)
-    table.add_column("Test name", style="bold")
-    table.add_column("Fails", justify="right")
-    table.add_column("Total runs seen", justify="right")
-    table.add_column("Instability %", justify="right")
-
-    for test_name, fails, total in flaky_tests:
-        instability = (fails / total) * 100.0 if total else 0.0
-        table.add_row(test_name, str(fails), str(total), f"{instability:.1f}%")
-
-    console.print(table)
+    console.print(flaky_table(flaky_tests))
 
 
 def _render_history(history: List[Tuple[int, float]]) -> None:
@@ -105,7 +151,7 @@ def _render_history(history: List[Tuple[int, float]]) -> None:
     Renders a visual representation of the pass rate history. If the history
     is empty, it displays a message indicating the absence of data. For
     non-empty history, it displays a trend line and detailed pass rate
-    information for each run.
+    information for up to ``MAX_HISTORY_DETAILS`` of the most recent runs.
 
     The trend line uses colored blocks to indicate performance:
     green for pass rates >= 90% and red otherwise.
@@ -120,23 +166,17 @@ def _render_history(history: List[Tuple[int, float]]) -> None:
         console.print(Panel("No history yet.", title="📈 Pass rate history", border_style="blue"))
         return
 
-    # reverse so oldest first visually
-    hist_rev = list(reversed(history))
-
-    # make a simple block graph: pass >= 90 => green block, else red block
+    # make a simple block graph: pass >= 90 => green block, else red block.
+    # Iterate oldest first in one pass; only the newest runs get a detail line.
+    hidden = max(len(history) - MAX_HISTORY_DETAILS, 0)
     blocks = []
-    for _, rate in hist_rev:
-        if rate >= 90.0:
-            blocks.append("🟩")
-        else:
-            blocks.append("🟥")
-
-    trend_line = "".join(blocks)
-    detail_lines = []
-    for run_id, rate in hist_rev:
-        detail_lines.append(f"Run {run_id}: {rate:.1f}%")
-
-    panel_text = f"{trend_line}\n" + "\n".join(detail_lines)
+    detail_lines = [f"… {hidden} earlier runs"] if hidden else []
+    for i, (run_id, rate) in enumerate(reversed(history)):
+        blocks.append(TREND_BLOCKS[rate >= 90.0])
+        if i >= hidden:
+            detail_lines.append(f"Run {run_id}: {rate:.1f}%")
+
+    panel_text = "".join(blocks) + "\n" + "\n".join(detail_lines)
     console.print(Panel(panel_text, title="📈 Pass rate trend", border_style="blue"))
 
 
@@ -6,13 +6,186 @@ Handles test run storage, retrieval, and statistical queries using SQLite.
 
 from __future__ import annotations
 
+import atexit
+import contextlib
+import functools
+import queue
 import sqlite3
+import threading
+import time
+import warnings
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
-from .utils import get_data_dir, utcnow_iso
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
+from .utils import get_data_dir, utcnow_micros
+
+__all__ = [
+    "DB_FILENAME",
+    "SCHEMA_VERSION",
+    "EXPORT_FIELDS",
+    "RUN_FIELDS",
+    "TEST_FIELDS",
+    "FLAKY_WINDOW",
+    "FLUSH_EVERY",
+    "FLUSH_TIMEOUT",
+    "StorageWorker",
+    "get_connection",
+    "open_connection",
+    "close_connection",
+    "ensure_db",
+    "start_run",
+    "finish_run",
+    "refresh_test_stats",
+    "record_test_result",
+    "record_test_results",
+    "flush_results",
+    "data_stamp",
+    "fetch_last_run_id",
+    "fetch_run_summary",
+    "fetch_latest_summary",
+    "fetch_slowest_tests",
+    "fetch_flaky_tests",
+    "fetch_flaky_stats",
+    "fetch_pass_rate_history",
+    "fetch_all_runs",
+    "iter_all_runs",
+    "iter_run_rows",
+    "fetch_tests_for_run",
+    "iter_tests_for_run",
+    "iter_test_rows",
+    "fetch_export_rows",
+]
 
 DB_FILENAME = "results.db"
 
+# Connections are opened once per thread and database path, see get_connection
+_local = threading.local()
+
+# Per-connection tuning. With the WAL journal, synchronous=NORMAL only syncs at
+# checkpoints; a crash can lose the last commits but never corrupts the database,
+# which is an acceptable trade for analytics data. Reads go through a memory map of
+# up to 1 GiB (SQLite clamps it to the file size) and a page cache of up to 128 MiB,
+# which is only filled as pages are read.
+CONNECTION_PRAGMAS = """
+    PRAGMA synchronous = NORMAL;
+    PRAGMA temp_store = MEMORY;
+    PRAGMA mmap_size = 1073741824;
+    PRAGMA cache_size = -131072;
+"""
+
+# Page size for new databases; fewer, larger pages suit the index range scans of the
+# report queries. It cannot change once a database uses the WAL journal.
+PAGE_SIZE = 8192
+
+# Statements run on every call are module constants so each SQL text is prepared once
+# per connection and then served from its statement cache (cached_statements=256)
+_SQL_INSERT_RESULT = """
+    INSERT INTO test_results (run_id, test_name, status, duration, error_message)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+# Test statuses are stored as small integers referencing the `statuses` lookup table,
+# which SCHEMA_SQL seeds with the same ids. The queries below use these ids as
+# literals (1 = passed, 2 = failed, 3 = skipped).
+_STATUS_ID = {"passed": 1, "failed": 2, "skipped": 3, "xfailed": 4}
+
+# Column definitions of `test_runs`, shared by ensure_db and its timestamp migration.
+# Timestamps are stored as integer microseconds since the Unix epoch (UTC).
+_RUNS_COLUMNS = """
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at INTEGER NOT NULL,
+    finished_at INTEGER
+"""
+
+# Column definitions of `test_results`, shared by ensure_db and its status migration.
+# No foreign keys are declared: SQLite would not enforce them without
+# PRAGMA foreign_keys, which is deliberately left off, since enforcing them costs a
+# lookup per inserted row. Rows are only written by this module, where `run_id`
+# always comes from a prior start_run() and `status` from _STATUS_ID.
+_RESULTS_COLUMNS = """
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL,
+    test_name TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    error_message TEXT
+"""
+
+# Bumped whenever SCHEMA_SQL or the migrations in ensure_db change; stored in the
+# database's user_version once ensure_db has brought it up to date
+SCHEMA_VERSION = 2
+
+# Complete schema, created in one transaction. Every statement is idempotent.
+SCHEMA_SQL = f"""
+    BEGIN IMMEDIATE;
+
+    CREATE TABLE IF NOT EXISTS test_runs ({_RUNS_COLUMNS});
+
+    CREATE TABLE IF NOT EXISTS statuses (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    );
+    INSERT OR IGNORE INTO statuses (id, name)
+    VALUES (1, 'passed'), (2, 'failed'), (3, 'skipped'), (4, 'xfailed');
+
+    CREATE TABLE IF NOT EXISTS test_results ({_RESULTS_COLUMNS});
+
+    CREATE TABLE IF NOT EXISTS test_stats (
+        test_name TEXT PRIMARY KEY,
+        fails INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        flips INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_results_name_run
+    ON test_results (test_name, run_id DESC, status);
+
+    CREATE INDEX IF NOT EXISTS idx_results_run_duration
+    ON test_results (run_id, duration DESC);
+
+    CREATE INDEX IF NOT EXISTS idx_results_run_status
+    ON test_results (run_id, status);
+
+    CREATE INDEX IF NOT EXISTS idx_runs_finished
+    ON test_runs (finished_at);
+
+    COMMIT;
+"""
+
+# Number of memoized results kept per read helper, see data_stamp
+QUERY_CACHE_SIZE = 256
+
+# Retries of a write transaction whose BEGIN IMMEDIATE finds the database locked, and
+# the initial delay in seconds between them; the delay doubles after every retry
+BUSY_RETRIES = 5
+BUSY_BACKOFF = 0.05
+
+# Upper bound for the number of results the storage worker writes in one transaction
+FLUSH_EVERY = 500
+
+# Seconds ``StorageWorker.flush`` waits for the queued results to be written
+FLUSH_TIMEOUT = 60.0
+
+# Column order of the rows produced by iter_run_rows
+RUN_FIELDS = ("run_id", "started_at", "finished_at", "total", "passed", "failed", "skipped")
+
+# Column order of the rows produced by iter_test_rows
+TEST_FIELDS = ("test_name", "status", "duration", "error_message")
+
+# Column order of the rows produced by fetch_export_rows
+EXPORT_FIELDS = (
+    "run_id",
+    "started_at",
+    "finished_at",
+    "test_name",
+    "status",
+    "duration",
+    "error_message",
+)
+
+# Number of most recent runs the persisted per-test flakiness stats cover
+FLAKY_WINDOW = 20
+
 
 def _get_db_path() -> Path:
     """
@@ -27,29 +200,286 @@ def _get_db_path() -> Path:
 
 def get_connection() -> sqlite3.Connection:
     """
-    Creates and returns a connection to the SQLite database.
+    Returns the connection to the SQLite database for the calling thread.
+
+    The connection is opened on first use and then reused for every later call from
+    the same thread, so storage helpers do not pay for opening the file, applying
+    PRAGMAs and reading the schema on each call. If the database path changes (for
+    example after a change of working directory) the old connection is closed and a
+    new one is opened for the new path.
 
-    The function establishes a connection to the database defined by the path
-    retrieved from the `_get_db_path` function. It also sets the row factory
-    for the connection to return rows as dictionary-like objects for easier
-    access to column data via keys.
+    The connection runs in autocommit mode (``isolation_level=None``); helpers that
+    issue several statements group them with ``_transaction``. It uses a row factory
+    returning dictionary-like ``sqlite3.Row`` objects, a larger prepared statement
+    cache, and ``CONNECTION_PRAGMAS``. The WAL journal mode is persistent and set by
+    ``ensure_db``. The connection is owned by this module: use ``close_connection``
+    rather than closing it directly.
 
     :return: SQLite connection object configured with row_factory set to
              sqlite3.Row
     :rtype: sqlite3.Connection
     """
-    conn = sqlite3.connect(_get_db_path())
+    path = _get_db_path()
+    conn: Optional[sqlite3.Connection] = getattr(_local, "conn", None)
+    if conn is not None and _local.path == path:
+        return conn
+    if conn is not None:
+        conn.close()
+
+    conn = _open_connection(path)
+    _local.conn = conn
+    _local.path = path
+    return conn
+
+
+def _open_connection(path: Path) -> sqlite3.Connection:
+    """
+    Opens a new autocommit connection to the database at `path` with the settings
+    described in ``get_connection``.
+
+    :param path: The path of the database file.
+    :type path: Path
+    :return: The new connection.
+    :rtype: sqlite3.Connection
+    """
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False,
+                           cached_statements=256)
     conn.row_factory = sqlite3.Row
+    conn.executescript(CONNECTION_PRAGMAS)
     return conn
 
 
+def open_connection() -> sqlite3.Connection:
+    """
+    Opens a new connection to the current database with the settings described in
+    ``get_connection``, but without caching it. The caller owns the connection and
+    must close it. Use it for work that outlives a single call on one thread, such
+    as a cursor that is advanced from whichever thread serves the next step of a
+    streamed response; the cached connection of a thread must not be used there.
+
+    :return: The new connection.
+    :rtype: sqlite3.Connection
+    """
+    return _open_connection(_get_db_path())
+
+
+def close_connection() -> None:
+    """
+    Closes the calling thread's database connection, if one is open. The next call to
+    ``get_connection`` opens a fresh one.
+
+    :return: None
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+        _local.path = None
+
+
+# Closes the main thread's connection at exit; connections of other threads are
+# released together with their thread's local data
+atexit.register(close_connection)
+
+
+@contextlib.contextmanager
+def _transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """
+    Groups the statements issued inside the ``with`` block into one write transaction
+    on an autocommit connection. The transaction is committed when the block completes
+    and rolled back if it raises.
+
+    The transaction is opened with `BEGIN IMMEDIATE`, which takes the write lock up
+    front instead of upgrading a read lock on the first write, the point at which a
+    deferred transaction can fail with `SQLITE_BUSY` while other connections are
+    active. If the database stays locked beyond the connection's busy timeout, the
+    `BEGIN` is retried up to ``BUSY_RETRIES`` times with exponential backoff; nothing
+    has been written at that point, so retrying is always safe.
+
+    :param conn: The connection to run the transaction on.
+    :type conn: sqlite3.Connection
+    :raises sqlite3.OperationalError: If the database is still locked after the last
+        retry.
+    :return: The same connection, for use inside the ``with`` block.
+    :rtype: Iterator[sqlite3.Connection]
+    """
+    delay = BUSY_BACKOFF
+    for attempt in range(BUSY_RETRIES + 1):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            break
+        except sqlite3.OperationalError as exc:
+            if "locked" not in str(exc) or attempt == BUSY_RETRIES:
+                raise
+            time.sleep(delay)
+            delay *= 2
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+class StorageWorker(threading.Thread):
+    """
+    Background thread that writes the results passed to ``record_test_result``.
+
+    Results are put on ``q`` together with the path of the database they belong to, and
+    the thread drains the queue in batches of up to ``FLUSH_EVERY`` results, writing
+    the results of each database with one `executemany` inside a single transaction on
+    its own connection. The thread calling ``record_test_result``, i.e.
+    the pytest main loop, therefore never waits for the disk. Readers keep using their
+    own connections; the WAL journal lets them read while the worker writes.
+
+    Besides ``(path, row)`` pairs the queue carries ``threading.Event`` objects, which are set
+    once everything queued before them has been written (see ``flush``), and ``None``,
+    which stops the thread.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(name="pytest-enhanced-storage", daemon=True)
+        self.q: queue.SimpleQueue = queue.SimpleQueue()
+        self.error: Optional[BaseException] = None
+
+    def run(self) -> None:
+        """
+        Consumes the queue until the stop sentinel is received.
+
+        :return: None
+        """
+        conn: Optional[sqlite3.Connection] = None
+        conn_path: Optional[Path] = None
+        stop = False
+        while not stop:
+            batches: Dict[Path, List[Tuple]] = {}
+            size = 0
+            done = []
+            item = self.q.get()
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    done.append(item)
+                else:
+                    path, row = item
+                    batches.setdefault(path, []).append(row)
+                    size += 1
+                if stop or size >= FLUSH_EVERY:
+                    break
+                try:
+                    item = self.q.get_nowait()
+                except queue.Empty:
+                    break
+
+            for path, rows in batches.items():
+                try:
+                    if conn is None or path != conn_path:
+                        if conn is not None:
+                            # forgotten before reopening, so a failed open is retried
+                            conn.close()
+                            conn = conn_path = None
+                        conn = _open_connection(path)
+                        conn_path = path
+                    with _transaction(conn):
+                        conn.executemany(_SQL_INSERT_RESULT, rows)
+                except Exception as exc:
+                    # reported to the next caller of flush() instead of killing the thread
+                    self.error = exc
+            for event in done:
+                event.set()
+
+        if conn is not None:
+            conn.close()
+
+    def flush(self, timeout: float = FLUSH_TIMEOUT) -> None:
+        """
+        Blocks until every result queued so far has been written. A write error raised
+        in the worker since the previous flush is re-raised here.
+
+        :param timeout: The number of seconds to wait for the queued results.
+        :type timeout: float
+        :raises RuntimeError: If the worker thread is no longer running, so the
+            results would never be written.
+        :raises TimeoutError: If the results have not been written within `timeout`.
+        :return: None
+        """
+        event = threading.Event()
+        self.q.put(event)
+        deadline = time.monotonic() + timeout
+        while not event.wait(min(0.1, max(deadline - time.monotonic(), 0))):
+            if not self.is_alive():
+                error, self.error = self.error, None
+                raise RuntimeError(
+                    "The storage worker has stopped; queued results were not written"
+                ) from error
+            if time.monotonic() >= deadline:
+                raise TimeoutError("Queued results were not written within %.1fs" % timeout)
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def stop(self) -> None:
+        """
+        Writes the remaining queued results and stops the thread.
+
+        :return: None
+        """
+        self.q.put(None)
+        self.join()
+
+
+_worker: Optional[StorageWorker] = None
+_worker_lock = threading.Lock()
+
+
+def _get_worker() -> StorageWorker:
+    """
+    Returns the storage worker of this process, starting it on first use. The worker
+    is stopped, and its queue written out, when the interpreter exits. A worker that
+    has stopped running is replaced by a new one.
+
+    :return: The running storage worker.
+    :rtype: StorageWorker
+    """
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = StorageWorker()
+            _worker.start()
+            atexit.register(_worker.stop)
+        return _worker
+
+
 def ensure_db() -> None:
     """
-    Ensures that the necessary database tables exist. If the tables `test_runs` and `test_results`
-    do not already exist, this function will create them. The `test_runs` table tracks individual
-    test runs with unique identifiers, start times, and optional finish times. The `test_results`
-    table records individual test results, linking them to the related test run and storing
-    information such as test name, status, duration, and optional error messages.
+    Ensures that the database uses the WAL journal and that the necessary database tables
+    exist. The schema is created by the single ``SCHEMA_SQL`` script, and a database that
+    has been fully set up records ``SCHEMA_VERSION`` in its `user_version`, so later
+    calls only cost that one lookup. If the tables `test_runs` and `test_results` do
+    not already exist, this function will create them. The `test_runs` table tracks
+    individual test runs with unique identifiers, start times, and optional finish
+    times. The `test_results` table records individual test results, linking them to
+    the related test run and storing information such as test name, status, duration,
+    and optional error messages.
+    Run timestamps are stored as integer microseconds since the Unix epoch; databases
+    that still hold ISO 8601 text timestamps are migrated in place.
+    Statuses are stored as integer ids referencing the small `statuses` lookup table,
+    which keeps result rows and their indexes narrow. Databases written by older
+    versions, which stored the status as text, are migrated in place.
+
+    The `test_stats` table holds per-test flakiness figures over the last
+    ``FLAKY_WINDOW`` runs. It is rebuilt by ``refresh_test_stats`` whenever a run
+    finishes, and backfilled here for databases that already hold results.
+
+    Three composite indexes are created on `test_results` as well: one on
+    ``(test_name, run_id DESC, status)`` that covers the per-test flaky window, one
+    on ``(run_id, duration DESC)`` that lets the slowest-tests query walk a run in
+    duration order and stop at its LIMIT without sorting, and one on
+    ``(run_id, status)`` that covers the per-run status counts. Each of them also
+    serves plain lookups by its leading column. An index on `test_runs.finished_at`
+    answers the ``MAX(finished_at)`` of ``data_stamp``. Finally the planner statistics are
+    refreshed with a sampled `ANALYZE` so that the indexes are picked up.
 
     :param: None
     :return: None
@@ -57,28 +487,114 @@ def ensure_db() -> None:
     conn = get_connection()
     cur = conn.cursor()
 
+    # Databases already set up by this version skip everything below
+    if cur.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+
+    # Only takes effect on a new, empty database, so it must precede the switch to WAL
+    cur.execute(f"PRAGMA page_size = {PAGE_SIZE}")
+
+    # WAL lets readers (CLI, web) run while the plugin writes, and is remembered by
+    # the database file itself. The returned mode is read so that the statement is
+    # finished before the schema script commits.
+    cur.execute("PRAGMA journal_mode = WAL").fetchall()
+
+    conn.executescript(SCHEMA_SQL)
+
+    with _transaction(conn):
+        migrated = False
+        if _column_type(cur, "test_runs", "started_at") == "TEXT":
+            _migrate_text_timestamps(cur)
+            migrated = True
+        if _column_type(cur, "test_results", "status") == "TEXT":
+            _migrate_text_statuses(cur)
+            migrated = True
+    if migrated:
+        # recreates the tables and indexes dropped along with the migrated tables
+        conn.executescript(SCHEMA_SQL)
+
     cur.execute("""
-        CREATE TABLE IF NOT EXISTS test_runs (
-            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            started_at TEXT NOT NULL,
-            finished_at TEXT
-        )
+        SELECT EXISTS(SELECT 1 FROM test_stats) AS stats,
+               EXISTS(SELECT 1 FROM test_results) AS results
     """)
+    row = cur.fetchone()
+    if row["results"] and not row["stats"]:
+        refresh_test_stats()
+
+    # analysis_limit samples each index, so this stays cheap on large databases
+    cur.execute("PRAGMA analysis_limit = 400")
+    cur.execute("ANALYZE")
+
+    # only recorded once every step above has succeeded
+    cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def _column_type(cur: sqlite3.Cursor, table: str, column: str) -> Optional[str]:
+    """
+    Looks up the declared type of a table column.
 
+    :param cur: A cursor of the connection to inspect.
+    :type cur: sqlite3.Cursor
+    :param table: The name of the table.
+    :type table: str
+    :param column: The name of the column.
+    :type column: str
+    :return: The declared type, e.g. "TEXT", or None if the column does not exist.
+    :rtype: Optional[str]
+    """
+    cur.execute("SELECT type FROM pragma_table_info(?) WHERE name = ?", (table, column))
+    row = cur.fetchone()
+    return row["type"] if row else None
+
+
+def _migrate_text_statuses(cur: sqlite3.Cursor) -> None:
+    """
+    Rewrites a `test_results` table that stores statuses as text into the current
+    layout with integer status ids. Statuses outside of the known set are added to the
+    `statuses` table first, so no result is lost. Must run inside a transaction; the
+    indexes of the old table are dropped with it and recreated by ``ensure_db``.
+
+    :param cur: A cursor of the connection running the migration.
+    :type cur: sqlite3.Cursor
+    :return: None
+    """
+    cur.execute("INSERT OR IGNORE INTO statuses (name) SELECT DISTINCT status FROM test_results")
+    cur.execute(f"CREATE TABLE test_results_new ({_RESULTS_COLUMNS})")
     cur.execute("""
-        CREATE TABLE IF NOT EXISTS test_results (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            run_id INTEGER NOT NULL,
-            test_name TEXT NOT NULL,
-            status TEXT NOT NULL,
-            duration REAL NOT NULL,
-            error_message TEXT,
-            FOREIGN KEY(run_id) REFERENCES test_runs(run_id)
-        )
+        INSERT INTO test_results_new (id, run_id, test_name, status, duration, error_message)
+        SELECT tr.id, tr.run_id, tr.test_name, s.id, tr.duration, tr.error_message
+        FROM test_results tr
+        JOIN statuses s ON s.name = tr.status
+    """)
+    cur.execute("DROP TABLE test_results")
+    cur.execute("ALTER TABLE test_results_new RENAME TO test_results")
+
+
+def _migrate_text_timestamps(cur: sqlite3.Cursor) -> None:
+    """
+    Rewrites a `test_runs` table that stores ISO 8601 text timestamps into the current
+    layout with integer microseconds since the Unix epoch. The `test_stats` table of
+    such a database is dropped as well, since it is derived data; ``ensure_db``
+    recreates and refills it. Must run inside a transaction.
+
+    :param cur: A cursor of the connection running the migration.
+    :type cur: sqlite3.Cursor
+    :return: None
+    """
+    cur.execute(f"CREATE TABLE test_runs_new ({_RUNS_COLUMNS})")
+    cur.execute("""
+        INSERT INTO test_runs_new (run_id, started_at, finished_at)
+        SELECT run_id,
+               CAST(strftime('%s', started_at) AS INTEGER) * 1000000,
+               CAST(strftime('%s', finished_at) AS INTEGER) * 1000000
+        FROM test_runs
     """)
+    cur.execute("DROP TABLE test_runs")
+    cur.execute("ALTER TABLE test_runs_new RENAME TO test_runs")
+    cur.execute("DROP TABLE IF EXISTS test_stats")
+
 
-    conn.commit()
-    conn.close()
+_SQL_START_RUN = "INSERT INTO test_runs (started_at) VALUES (?)"
 
 
 def start_run() -> int:
@@ -87,43 +603,100 @@ def start_run() -> int:
 
     This function inserts a new entry into the `test_runs` table with the
     current UTC timestamp as the start time. It returns the ID of the newly
-    created test run. The database connection is established, used for the
-    transaction, and then properly closed.
+    created test run.
 
     :return: The unique identifier of the newly created test run.
     :rtype: int
     """
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("INSERT INTO test_runs (started_at) VALUES (?)", (utcnow_iso(),))
+    cur.execute(_SQL_START_RUN, (utcnow_micros(),))
     run_id = cur.lastrowid
-    conn.commit()
-    conn.close()
     return run_id
 
 
+_SQL_FINISH_RUN = "UPDATE test_runs SET finished_at = ? WHERE run_id = ?"
+
+
 def finish_run(run_id: int) -> None:
     """
     Marks a test run as finished by updating the `finished_at` timestamp for the specified
     run ID in the database. This function interacts with the database to record the
-    completion time using the current UTC timestamp in ISO format.
+    completion time as microseconds since the Unix epoch, then rebuilds the
+    persisted per-test flakiness stats so they include the finished run. Both writes
+    share one transaction, so finishing a run costs a single commit. Results still
+    buffered by ``record_test_result`` are flushed first.
 
     :param run_id: The ID of the test run to mark as finished.
     :type run_id: int
     :return: None
     """
+    flush_results()
     conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("UPDATE test_runs SET finished_at = ? WHERE run_id = ?", (utcnow_iso(), run_id))
-    conn.commit()
-    conn.close()
+    with _transaction(conn):
+        cur = conn.cursor()
+        cur.execute(_SQL_FINISH_RUN, (utcnow_micros(), run_id))
+        _rebuild_test_stats(cur, FLAKY_WINDOW)
+
+
+def refresh_test_stats(window: int = FLAKY_WINDOW) -> None:
+    """
+    Rebuilds the `test_stats` table from the results of the most recent test runs.
+
+    For every test seen in the last `window` runs the table stores the number of
+    failures, the number of recorded results and the number of pass/fail flips, so
+    that flaky-test lookups read a handful of precomputed rows instead of
+    aggregating the raw result history on every call. The table is replaced in a
+    single transaction.
+
+    :param window: The number of most recent test runs to aggregate. Defaults to
+        ``FLAKY_WINDOW``.
+    :type window: int
+    :return: None
+    """
+    conn = get_connection()
+    with _transaction(conn):
+        _rebuild_test_stats(conn.cursor(), window)
+
+
+def _rebuild_test_stats(cur: sqlite3.Cursor, window: int) -> None:
+    """
+    Replaces the contents of `test_stats` as described in ``refresh_test_stats``.
+    Must run inside a transaction.
+
+    :param cur: A cursor of the connection running the transaction.
+    :type cur: sqlite3.Cursor
+    :param window: The number of most recent test runs to aggregate.
+    :type window: int
+    :return: None
+    """
+    cur.execute("DELETE FROM test_stats")
+    cur.execute("""
+        INSERT INTO test_stats (test_name, fails, total, flips, updated_at)
+        SELECT test_name,
+               SUM(status = 2),
+               COUNT(*),
+               SUM(flipped),
+               ?
+        FROM (
+            SELECT test_name,
+                   status,
+                   status != LAG(status, 1, status)
+                       OVER (PARTITION BY test_name ORDER BY run_id) AS flipped
+            FROM test_results
+            WHERE run_id IN (SELECT run_id FROM test_runs ORDER BY run_id DESC LIMIT ?)
+        )
+        GROUP BY test_name
+    """, (utcnow_micros(), window))
 
 
 def record_test_result(run_id: int, test_name: str, status: str, duration: float, error_message: Optional[str]) -> None:
     """
-    Records the result of a test execution into the `test_results` database table. The
-    function connects to the database, inserts a new entry with test run details, commits
-    the changes, and then closes the connection.
+    Records the result of a test execution for the `test_results` database table. The
+    result is handed to the background ``StorageWorker``, which writes queued results in
+    batched transactions, so this call returns without touching the database. Use
+    ``flush_results`` to wait until the result has been written; ``finish_run`` does
+    so before marking the run as finished.
 
     This is used for tracking results of individual test executions, allowing for later
     analysis or reporting of test outcomes. It supports logging information, including the
@@ -135,25 +708,114 @@ def record_test_result(run_id: int, test_name: str, status: str, duration: float
     :param status: Execution result of the test (e.g., "passed", "failed").
     :param duration: Time taken for execution in seconds.
     :param error_message: Optional error message when the test fails.
+    :raises ValueError: If `status` is not a known test status.
+    :return: None
+    """
+    # the caller already holds a connection from start_run; using its path saves a
+    # lookup and keeps results in the run's database if a test changes directory
+    path = getattr(_local, "path", None) or _get_db_path()
+    row = (run_id, test_name, _status_id(status), duration, error_message)
+    _get_worker().q.put((path, row))
+
+
+def flush_results() -> None:
+    """
+    Waits until every result passed to ``record_test_result`` has been written to the
+    database. Does nothing if no result has been recorded in this process, and is safe
+    to call repeatedly.
+
+    :raises sqlite3.Error: If the storage worker failed to write queued results.
+    :raises RuntimeError: If the storage worker stopped before writing them.
+    :raises TimeoutError: If they were not written within ``FLUSH_TIMEOUT`` seconds.
+    :return: None
+    """
+    if _worker is not None:
+        _worker.flush()
+
+
+def record_test_results(rows: Iterable[Tuple[int, str, str, float, Optional[str]]]) -> None:
+    """
+    Records a batch of test results into the `test_results` database table using a single
+    transaction. Every row is inserted through one `executemany` call and committed once,
+    so the cost of the commit is paid per batch rather than per test.
+
+    :param rows: An iterable of ``(run_id, test_name, status, duration, error_message)``
+        tuples, in the same order as the arguments of ``record_test_result``.
+    :raises ValueError: If a row has an unknown test status; no row of the batch is
+        written in that case.
     :return: None
     """
     conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO test_results (run_id, test_name, status, duration, error_message)
-        VALUES (?, ?, ?, ?, ?)
-    """, (run_id, test_name, status, duration, error_message))
-    conn.commit()
-    conn.close()
+    with _transaction(conn):
+        conn.executemany(_SQL_INSERT_RESULT, (
+            (run_id, test_name, _status_id(status), duration, error_message)
+            for run_id, test_name, status, duration, error_message in rows
+        ))
+
+
+def _status_id(status: str) -> int:
+    """
+    Translates a test status name into the id stored in `test_results`.
+
+    :param status: The status name, e.g. "passed".
+    :type status: str
+    :raises ValueError: If the status is not one of the known statuses.
+    :return: The id of the status in the `statuses` table.
+    :rtype: int
+    """
+    try:
+        return _STATUS_ID[status]
+    except KeyError:
+        raise ValueError(f"Unknown test status: {status!r}") from None
+
+
+_SQL_DATA_STAMP = """
+    SELECT (SELECT seq FROM sqlite_sequence WHERE name = 'test_runs'),
+           (SELECT seq FROM sqlite_sequence WHERE name = 'test_results'),
+           (SELECT updated_at FROM test_stats LIMIT 1),
+           (SELECT MAX(finished_at) FROM test_runs)
+"""
+
+
+def data_stamp() -> Tuple[Path, Optional[int], Optional[int], Optional[int], Optional[int]]:
+    """
+    Identifies the current contents of the database for the memoized read helpers and
+    for callers that cache data derived from them, such as the web API.
+
+    Runs and results are only ever appended, and both tables use AUTOINCREMENT keys, so
+    the last assigned ids in `sqlite_sequence` change with every write that can affect
+    a cached query, whichever process or connection made it. Memoized helpers take the
+    stamp as part of their cache key: a write simply makes later calls miss, and no
+    explicit invalidation is needed. The `test_stats` table is rewritten instead, by
+    ``finish_run`` and ``refresh_test_stats``; every rebuild gives all of its rows the
+    same new `updated_at`, so the value of any one row identifies its contents. Neither
+    changes when ``finish_run`` sets the `finished_at` of a run, e.g. one without
+    results, so the latest finish time is part of the stamp as well; it only grows,
+    since every run is finished with the current time. The stamp costs two lookups
+    in a two-row table, one row read and one lookup at the end of an index, about as
+    much as the cheapest memoized query; callers that make several reads for one
+    request should therefore take it once and pass it on as the `stamp` argument.
+
+    :return: The database path, the last assigned run and result ids, the time of the
+        last `test_stats` rebuild and the latest finish time of a run.
+    :rtype: Tuple[Path, Optional[int], Optional[int], Optional[int], Optional[int]]
+    """
+    conn = get_connection()
+    runs, results, stats, finished = conn.execute(_SQL_DATA_STAMP).fetchone()
+    return _local.path, runs, results, stats, finished
+
+
+_SQL_LAST_RUN = "SELECT MAX(run_id) FROM test_runs"
 
 
 def fetch_last_run_id() -> Optional[int]:
     """
     Fetches the last `run_id` from the `test_runs` table in the database.
 
-    This function connects to the database, retrieves the most recent `run_id`
-    from the `test_runs` table, and returns it. If no rows are found in the
-    table, the function returns `None`.
+    This function queries the database, retrieves the most recent `run_id`
+    from the `test_runs` table with ``MAX(run_id)``, which SQLite answers from the
+    end of the primary key B-tree, and returns it. If no rows are found in the
+    table, the aggregate is NULL and the function returns `None`.
 
     :return: The most recently available `run_id` from the `test_runs` table
              or `None` if the table is empty
@@ -161,22 +823,37 @@ def fetch_last_run_id() -> Optional[int]:
     """
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("SELECT run_id FROM test_runs ORDER BY run_id DESC LIMIT 1")
-    row = cur.fetchone()
-    conn.close()
-    return row["run_id"] if row else None
+    cur.row_factory = None
+    cur.execute(_SQL_LAST_RUN)
+    run_id = cur.fetchone()[0]
+    return None if run_id is None else int(run_id)
 
 
-def fetch_run_summary(run_id: int) -> Dict[str, int]:
+_SQL_SUMMARY = """
+    SELECT COUNT(*) AS total,
+           COALESCE(SUM(status = 1), 0) AS passed,
+           COALESCE(SUM(status = 2), 0) AS failed,
+           COALESCE(SUM(status = 3), 0) AS skipped
+    FROM test_results
+    WHERE run_id = ?
+"""
+
+
+def fetch_run_summary(run_id: int, stamp: Optional[Tuple] = None) -> Dict[str, int]:
     """
     Fetches the summary of test results for the given run ID from the database.
 
-    The function retrieves test results for a specific run ID, summarizes them
-    by their status, and returns a dictionary containing the total count of results
-    as well as the counts for passed, failed, and skipped tests.
+    The function counts the test results of a specific run ID per status with
+    conditional sums in a single-row query, and returns a dictionary containing the
+    total count of results as well as the counts for passed, failed, and skipped
+    tests. Statuses that do not occur in the run are counted as 0. Results are
+    memoized until the database receives new runs or results (see ``data_stamp``).
 
     :param run_id: The ID of the test run whose results need to be summarized.
     :type run_id: int
+    :param stamp: The result of ``data_stamp`` if the caller has already taken it,
+        e.g. once per request; it is taken here otherwise.
+    :type stamp: Optional[Tuple]
     :return: A dictionary containing the summarized counts of test results:
              - total: Total number of test results.
              - passed: Number of passed tests.
@@ -184,87 +861,174 @@ def fetch_run_summary(run_id: int) -> Dict[str, int]:
              - skipped: Number of skipped tests.
     :rtype: Dict[str, int]
     """
+    return dict(_cached_run_summary(data_stamp() if stamp is None else stamp, run_id))
+
+
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _cached_run_summary(stamp: Tuple, run_id: int) -> Dict[str, int]:
+    """
+    Runs the query of ``fetch_run_summary``; memoized per ``data_stamp``.
+    """
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("""
-        SELECT status, COUNT(*) AS c FROM test_results
-        WHERE run_id = ? GROUP BY status
-    """, (run_id,))
-    data = {row["status"]: row["c"] for row in cur.fetchall()}
-    conn.close()
-    return {
-        "total": sum(data.values()),
-        "passed": data.get("passed", 0),
-        "failed": data.get("failed", 0),
-        "skipped": data.get("skipped", 0),
-    }
+    cur.execute(_SQL_SUMMARY, (run_id,))
+    return dict(cur.fetchone())
 
 
-def fetch_slowest_tests(run_id: int, limit: int = 5) -> List[Tuple[str, float]]:
+_SQL_LATEST_SUMMARY = """
+    SELECT r.run_id,
+           COUNT(tr.id) AS total,
+           SUM(CASE WHEN tr.status = 1 THEN 1 ELSE 0 END) AS passed,
+           SUM(CASE WHEN tr.status = 2 THEN 1 ELSE 0 END) AS failed,
+           SUM(CASE WHEN tr.status = 3 THEN 1 ELSE 0 END) AS skipped,
+           ROUND(100.0 * SUM(CASE WHEN tr.status = 1 THEN 1 ELSE 0 END)
+                 / NULLIF(COUNT(tr.id), 0), 2) AS pass_rate
+    FROM (SELECT MAX(run_id) AS run_id FROM test_runs) r
+    LEFT JOIN test_results tr ON tr.run_id = r.run_id
+    GROUP BY r.run_id
+"""
+
+
+def fetch_latest_summary() -> Optional[Dict]:
+    """
+    Fetches the ID and the result summary of the most recent test run in a single query.
+
+    This combines ``fetch_last_run_id`` and ``fetch_run_summary``: the latest run is
+    resolved with ``MAX(run_id)`` and its results are counted per status in the same
+    statement, so callers that need both pay for one round-trip. The pass rate is
+    computed by the same query and is `None` for a run without results.
+
+    :return: A dictionary with the keys 'run_id', 'total', 'passed', 'failed',
+             'skipped' and 'pass_rate' (a percentage rounded to two decimals), or
+             `None` if no test run has been recorded yet.
+    :rtype: Optional[Dict]
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(_SQL_LATEST_SUMMARY)
+    row = cur.fetchone()
+    if row is None or row["run_id"] is None:
+        return None
+    return dict(row)
+
+
+_SQL_SLOWEST = """
+    SELECT test_name, duration
+    FROM test_results
+    WHERE run_id = ?
+    ORDER BY duration DESC
+    LIMIT ?
+"""
+
+
+def fetch_slowest_tests(
+        run_id: int,
+        limit: int = 5,
+        stamp: Optional[Tuple] = None,
+) -> List[Tuple[str, float]]:
     """
     Fetch the slowest running tests for a specific test run.
 
     This function retrieves a list of test names and their execution
     durations in a specified test run, ordered by their duration in
     descending order. The number of tests retrieved can be controlled
-    by the `limit` parameter.
+    by the `limit` parameter. Results are memoized until the database receives
+    new runs or results (see ``data_stamp``).
 
     :param run_id: The unique identifier for the test run.
     :param limit: The maximum number of test results to retrieve
         (default is 5).
+    :param stamp: The result of ``data_stamp`` if the caller has already taken it,
+        e.g. once per request; it is taken here otherwise.
     :return: A list of tuples, where each tuple contains the name of
         the test and its execution duration.
     """
+    return list(_cached_slowest_tests(data_stamp() if stamp is None else stamp, run_id, limit))
+
+
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _cached_slowest_tests(stamp: Tuple, run_id: int, limit: int) -> List[Tuple[str, float]]:
+    """
+    Runs the query of ``fetch_slowest_tests``; memoized per ``data_stamp``.
+    """
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("""
-        SELECT test_name, duration
-        FROM test_results
-        WHERE run_id = ?
-        ORDER BY duration DESC
-        LIMIT ?
-    """, (run_id, limit))
-    rows = [(r["test_name"], r["duration"]) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    cur.row_factory = None  # plain tuples are exactly the shape we return
+    cur.execute(_SQL_SLOWEST, (run_id, limit))
+    return cur.fetchall()
+
+
+_SQL_FLAKY_STATS = """
+    SELECT test_name, fails, total, flips, ROUND(100.0 * fails / total, 1) AS instability
+    FROM test_stats
+    WHERE fails >= ?
+    ORDER BY fails DESC
+"""
 
 
-def fetch_flaky_tests(window: int = 20, min_failures: int = 2) -> List[Tuple[str, int, int]]:
+def fetch_flaky_stats(min_failures: int = 2) -> List[Tuple[str, int, int, int, float]]:
     """
-    Fetches flaky test results based on a specified number of recent test runs and a minimum number
-    of failures.
+    Fetches flaky tests from the precomputed `test_stats` table, which covers the last
+    ``FLAKY_WINDOW`` runs as of the most recently finished run.
 
-    The function queries a database to identify tests that have failed in a defined number of recent
-    test run IDs and returns a list of test names, their respective failure counts, and total test run
-    counts. Tests are filtered to include only those with failure counts greater than or equal to
-    `min_failures`, sorted in descending order of failures.
+    The table is rebuilt with a `LAG()` window function that compares every result
+    with the previous result of the same test, so reading flaky tests only touches
+    the rows of tests that qualify instead of aggregating the result history.
 
-    :param window: The number of most recent test runs to include in the computation.
-    :param min_failures: The minimum number of failures a test must have to be included in the result.
-    :return: A list of tuples, where each tuple contains the test name, failure count, and total
-      number of test runs for each flaky test.
+    :param min_failures: The minimum number of failures a test must have to be included
+        in the result.
+    :return: A list of tuples, where each tuple contains the test name, failure count, total
+      number of test runs, the number of outcome flips and the instability percentage, sorted
+      by failures in descending order.
     """
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("SELECT run_id FROM test_runs ORDER BY run_id DESC LIMIT ?", (window,))
-    run_ids = [r["run_id"] for r in cur.fetchall()]
-    if not run_ids:
-        conn.close()
-        return []
-    placeholders = ",".join("?" for _ in run_ids)
-    cur.execute(f"""
-        SELECT test_name,
-               SUM(CASE WHEN status='failed' THEN 1 ELSE 0 END) AS fails,
-               COUNT(*) AS total
-        FROM test_results
-        WHERE run_id IN ({placeholders})
-        GROUP BY test_name
-        HAVING fails >= ?
-        ORDER BY fails DESC
-    """, (*run_ids, min_failures))
-    rows = [(r["test_name"], r["fails"], r["total"]) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    cur.row_factory = None
+    cur.execute(_SQL_FLAKY_STATS, (min_failures,))
+    return cur.fetchall()
+
+
+def fetch_flaky_tests(
+        window: int = FLAKY_WINDOW,
+        min_failures: int = 2,
+) -> List[Tuple[str, int, int]]:
+    """
+    Fetches flaky tests as ``(test name, failure count, total runs)`` tuples, sorted by
+    failures in descending order.
+
+    Kept for callers of the earlier API, which aggregated the raw results of the last
+    `window` runs on every call. The figures are now read from the precomputed
+    `test_stats` table through ``fetch_flaky_stats`` and therefore always cover the
+    last ``FLAKY_WINDOW`` finished runs; any other `window` only triggers a warning.
+
+    :param window: The number of most recent runs the figures should cover.
+    :type window: int
+    :param min_failures: The minimum number of failures a test must have to be included
+        in the result.
+    :type min_failures: int
+    :return: A list of tuples, where each tuple contains the test name, failure count
+        and total number of test runs for each flaky test.
+    :rtype: List[Tuple[str, int, int]]
+    """
+    if window != FLAKY_WINDOW:
+        warnings.warn(
+            f"fetch_flaky_tests covers the last {FLAKY_WINDOW} finished runs; "
+            f"window={window} is ignored",
+            stacklevel=2,
+        )
+    return [(name, fails, total) for name, fails, total, _, _ in fetch_flaky_stats(min_failures)]
+
+
+_SQL_PASS_RATE = """
+    WITH recent AS (
+        SELECT run_id FROM test_runs ORDER BY run_id DESC LIMIT ?
+    )
+    SELECT tr.run_id, 100.0 * SUM(tr.status = 1) / COUNT(*) AS pass_rate
+    FROM test_results tr
+    JOIN recent USING (run_id)
+    GROUP BY tr.run_id
+    ORDER BY tr.run_id DESC
+"""
 
 
 def fetch_pass_rate_history(limit: int = 10) -> List[Tuple[int, float]]:
@@ -275,6 +1039,11 @@ def fetch_pass_rate_history(limit: int = 10) -> List[Tuple[int, float]]:
     runs. The pass rate is calculated as the percentage of tests that have passed
     in each test run. The test runs are returned in descending order of their IDs.
 
+    The run window is resolved first and only the results of those runs are
+    aggregated, through the covering ``(run_id, status)`` index, so the cost depends
+    on `limit` rather than on the size of the history. Runs without any results are
+    part of the window but have no pass rate and are left out of the list.
+
     :param limit: The maximum number of test runs to retrieve. Defaults to 10.
     :type limit: int
     :return: A list of tuples, each containing the test run ID and its pass rate
@@ -284,39 +1053,92 @@ def fetch_pass_rate_history(limit: int = 10) -> List[Tuple[int, float]]:
     """
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("""
-        SELECT r.run_id,
-               SUM(CASE WHEN tr.status='passed' THEN 1 ELSE 0 END)*1.0 / COUNT(*) * 100.0 AS pass_rate
-        FROM test_runs r
-        JOIN test_results tr ON tr.run_id = r.run_id
-        GROUP BY r.run_id
-        ORDER BY r.run_id DESC
-        LIMIT ?
-    """, (limit,))
-    result = [(r["run_id"], r["pass_rate"]) for r in cur.fetchall()]
-    conn.close()
-    return result
+    cur.row_factory = None
+    cur.execute(_SQL_PASS_RATE, (limit,))
+    return cur.fetchall()
+
+
+_SQL_ALL_RUNS = """
+    WITH recent AS (
+        SELECT run_id, started_at, finished_at FROM test_runs ORDER BY run_id DESC LIMIT ?
+    )
+    SELECT r.run_id,
+           strftime('%Y-%m-%dT%H:%M:%S+00:00', r.started_at / 1000000, 'unixepoch') AS started_at,
+           strftime('%Y-%m-%dT%H:%M:%S+00:00', r.finished_at / 1000000, 'unixepoch') AS finished_at,
+           COUNT(tr.status) AS total,
+           COALESCE(SUM(tr.status = 1), 0) AS passed,
+           COALESCE(SUM(tr.status = 2), 0) AS failed,
+           COALESCE(SUM(tr.status = 3), 0) AS skipped
+    FROM recent r
+    LEFT JOIN test_results tr ON tr.run_id = r.run_id
+    GROUP BY r.run_id
+    ORDER BY r.run_id DESC
+"""
 
 
 def fetch_all_runs(limit: int = 50) -> List[Dict]:
     """
     Fetches a limited number of test run records from the database in descending order
     based on the run ID. Each record includes the run ID, start time, and finish time.
-    This method establishes a connection to the database, executes the query, and fetches
-    the results before closing the connection.
+    The times are stored as integers and formatted as ISO 8601 UTC strings by SQLite,
+    with `finished_at` being `None` for a run that has not finished. Each record also
+    carries the status counts of ``fetch_run_summary``, computed in the same query by
+    joining the selected runs with their results through the covering
+    ``(run_id, status)`` index, so listing runs with their counts costs one query
+    rather than one per run.
 
     :param limit: The maximum number of records to fetch. Defaults to 50.
     :type limit: int
     :return: A list of dictionaries, each representing a test run record with the attributes
-        'run_id', 'started_at', and 'finished_at'.
+        'run_id', 'started_at', 'finished_at', 'total', 'passed', 'failed' and 'skipped'.
     :rtype: List[Dict]
     """
-    conn = get_connection()
+    return list(iter_all_runs(limit))
+
+
+def iter_all_runs(limit: int = 50) -> Iterator[Dict]:
+    """
+    Lazily yields the test run records of ``fetch_all_runs``, in the same shape and
+    order, converting each row to a dictionary as it is read from the cursor.
+
+    :param limit: The maximum number of records to yield. Defaults to 50.
+    :type limit: int
+    :return: An iterator of dictionaries with the attributes of ``RUN_FIELDS``.
+    :rtype: Iterator[Dict]
+    """
+    for row in iter_run_rows(limit):
+        yield dict(zip(RUN_FIELDS, row))
+
+
+def iter_run_rows(limit: int = 50, conn: Optional[sqlite3.Connection] = None) -> Iterator[Tuple]:
+    """
+    Lazily yields the test run records of ``iter_all_runs`` as plain tuples in
+    ``RUN_FIELDS`` order, as SQLite returns them, without building a dictionary or
+    an ``sqlite3.Row`` per record.
+
+    :param limit: The maximum number of records to yield. Defaults to 50.
+    :type limit: int
+    :param conn: The connection to read with, e.g. one from ``open_connection``.
+        Defaults to the calling thread's connection.
+    :type conn: Optional[sqlite3.Connection]
+    :return: An iterator of tuples with the values of ``RUN_FIELDS``.
+    :rtype: Iterator[Tuple]
+    """
+    if conn is None:
+        conn = get_connection()
     cur = conn.cursor()
-    cur.execute("SELECT run_id, started_at, finished_at FROM test_runs ORDER BY run_id DESC LIMIT ?", (limit,))
-    rows = cur.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    cur.row_factory = None
+    cur.execute(_SQL_ALL_RUNS, (limit,))
+    yield from cur
+
+
+_SQL_TESTS_FOR_RUN = """
+    SELECT tr.test_name, s.name AS status, tr.duration, tr.error_message
+    FROM test_results tr
+    JOIN statuses s ON s.id = tr.status
+    WHERE tr.run_id = ?
+    ORDER BY tr.id
+"""
 
 
 def fetch_tests_for_run(run_id: int) -> List[Dict]:
@@ -325,17 +1147,103 @@ def fetch_tests_for_run(run_id: int) -> List[Dict]:
 
     This function connects to a database, executes a query to retrieve test
     results associated with the provided run ID, and returns them as a list
-    of dictionaries. The returned dictionaries include details about the
-    test name, status, duration, and error message (if any).
+    of dictionaries in the order the results were recorded. The returned
+    dictionaries include details about the test name, status, duration, and
+    error message (if any).
 
     :param run_id: The unique identifier for the test run.
     :type run_id: int
     :return: A list of dictionaries containing test details for the given run ID.
     :rtype: List[Dict]
     """
+    return list(iter_tests_for_run(run_id))
+
+
+def iter_tests_for_run(run_id: int, chunk: int = 500) -> Iterator[Dict]:
+    """
+    Lazily yields the test details of a specific test run ID, in the same shape and
+    order as ``fetch_tests_for_run``.
+
+    Rows are pulled from the cursor with `fetchmany` in chunks of `chunk` rows, so
+    only one chunk is held in memory at a time no matter how many tests the run has.
+    Prefer this over ``fetch_tests_for_run`` when the results are only iterated.
+
+    :param run_id: The unique identifier for the test run.
+    :type run_id: int
+    :param chunk: The number of rows fetched from SQLite at a time. Defaults to 500.
+    :type chunk: int
+    :return: An iterator of dictionaries containing test details for the given run ID.
+    :rtype: Iterator[Dict]
+    """
+    for row in iter_test_rows(run_id, chunk):
+        yield dict(zip(TEST_FIELDS, row))
+
+
+def iter_test_rows(
+        run_id: int,
+        chunk: int = 500,
+        conn: Optional[sqlite3.Connection] = None,
+) -> Iterator[Tuple]:
+    """
+    Lazily yields the test details of ``iter_tests_for_run`` as plain tuples in
+    ``TEST_FIELDS`` order, read from the cursor in chunks of `chunk` rows.
+
+    :param run_id: The unique identifier for the test run.
+    :type run_id: int
+    :param chunk: The number of rows fetched from SQLite at a time. Defaults to 500.
+    :type chunk: int
+    :param conn: The connection to read with, e.g. one from ``open_connection``.
+        Defaults to the calling thread's connection.
+    :type conn: Optional[sqlite3.Connection]
+    :return: An iterator of tuples with the values of ``TEST_FIELDS``.
+    :rtype: Iterator[Tuple]
+    """
+    if conn is None:
+        conn = get_connection()
+    cur = conn.cursor()
+    cur.row_factory = None
+    cur.arraysize = chunk
+    cur.execute(_SQL_TESTS_FOR_RUN, (run_id,))
+    while True:
+        rows = cur.fetchmany()
+        if not rows:
+            break
+        yield from rows
+
+
+_SQL_EXPORT_ROWS = """
+    SELECT r.run_id,
+           strftime('%Y-%m-%dT%H:%M:%S+00:00', r.started_at / 1000000, 'unixepoch') AS started_at,
+           strftime('%Y-%m-%dT%H:%M:%S+00:00', r.finished_at / 1000000, 'unixepoch') AS finished_at,
+           tr.test_name, s.name AS status, tr.duration,
+           COALESCE(tr.error_message, '') AS error_message
+    FROM test_runs r
+    JOIN test_results tr ON tr.run_id = r.run_id
+    JOIN statuses s ON s.id = tr.status
+    WHERE r.run_id IN (SELECT run_id FROM test_runs ORDER BY run_id DESC LIMIT ?)
+    ORDER BY r.run_id DESC, tr.id
+"""
+
+
+def fetch_export_rows(limit: int = 50) -> Iterator[Tuple]:
+    """
+    Lazily yields every test result of the most recent test runs, joined with the
+    metadata of the run it belongs to.
+
+    All rows are produced by a single query that joins `test_runs` with
+    `test_results`, so exporting many runs costs one round-trip instead of one query
+    per run. Rows are plain tuples in ``EXPORT_FIELDS`` order rather than
+    ``sqlite3.Row`` objects, which avoids a wrapper allocation per exported row.
+    Rows are read from the cursor as they are consumed.
+
+    :param limit: The number of most recent test runs to include. Defaults to 50.
+    :type limit: int
+    :return: An iterator of tuples with the values of ``EXPORT_FIELDS``. Runs are
+        ordered from newest to oldest, results in recording order.
+    :rtype: Iterator[Tuple]
+    """
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("SELECT test_name, status, duration, error_message FROM test_results WHERE run_id = ?", (run_id,))
-    rows = cur.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    cur.row_factory = None
+    cur.execute(_SQL_EXPORT_ROWS, (limit,))
+    yield from cur
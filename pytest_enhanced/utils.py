@@ -1,9 +1,20 @@
 from __future__ import annotations
 
-import datetime as dt
+import functools
+import json
 import os
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:  # optional speedup, see the "fast" extra
+    orjson = None  # type: ignore[assignment]
+
+
+# Name of the data directory created in the working directory
+DATA_DIRNAME = ".pytest_enhanced"
 
 
 def get_data_dir() -> Path:
@@ -12,27 +23,43 @@ def get_data_dir() -> Path:
 
     This function creates a subdirectory named `.pytest_enhanced` in the current
     working directory if it does not already exist. The created or existing
-    directory path is then returned.
+    directory path is then returned. The result is memoized per working directory,
+    so only the first call for a directory touches the file system; a change of
+    working directory is picked up on the next call.
 
     :return: A ``Path`` object representing the `.pytest_enhanced` directory.
     :rtype: Path
     """
-    p = Path(os.getcwd()) / ".pytest_enhanced"
-    p.mkdir(exist_ok=True)
+    return _data_dir_for(os.getcwd())
+
+
+@functools.lru_cache(maxsize=None)
+def _data_dir_for(cwd: str) -> Path:
+    """
+    Resolves and creates the data directory for the working directory `cwd`.
+
+    :param cwd: The working directory.
+    :type cwd: str
+    :return: The `.pytest_enhanced` directory inside `cwd`.
+    :rtype: Path
+    """
+    p = Path(cwd, DATA_DIRNAME)
+    if not p.is_dir():
+        p.mkdir(exist_ok=True)
     return p
 
 
-def utcnow_iso() -> str:
+def utcnow_micros() -> int:
     """
-    Gets the current UTC time as an ISO 8601 formatted string.
+    Gets the current time as an integer number of microseconds since the Unix epoch.
 
-    This function retrieves the current UTC time with the microseconds
-    removed and represents it as a string formatted in ISO 8601.
+    This is the representation used for timestamps in the database: it takes eight
+    bytes, compares as a plain integer and needs no parsing.
 
-    :return: The current UTC time in ISO 8601 format.
-    :rtype: str
+    :return: The current time in microseconds since 1970-01-01T00:00:00Z.
+    :rtype: int
     """
-    return dt.datetime.now(dt.UTC).replace(microsecond=0).isoformat()
+    return time.time_ns() // 1000
 
 
 def format_duration(seconds: float) -> str:
@@ -46,7 +73,21 @@ def format_duration(seconds: float) -> str:
         by "s" for seconds.
     :rtype: str
     """
-    return f"{seconds:.2f}s"
+    # %-formatting a single float is cheaper than the equivalent f-string
+    return "%.2fs" % seconds
+
+
+def format_percent(value: Optional[float]) -> str:
+    """
+    Formats a percentage with one decimal place, or as "N/A" when there is no value,
+    e.g. the pass rate of a run without any recorded results.
+
+    :param value: The percentage to format, or None.
+    :type value: Optional[float]
+    :return: The formatted percentage followed by "%", or "N/A".
+    :rtype: str
+    """
+    return "N/A" if value is None else "%.1f%%" % value
 
 
 def safe_str(value: Optional[str]) -> str:
@@ -61,3 +102,25 @@ def safe_str(value: Optional[str]) -> str:
     :rtype: str
     """
     return value if value is not None else ""
+
+
+def dumps_json(value: Any) -> bytes:
+    """
+    Serializes a value to compact UTF-8 encoded JSON.
+
+    Uses ``orjson`` when it is installed and falls back to the standard library
+    ``json`` module otherwise. For the rows written by pytest-enhanced, i.e. dicts
+    with string keys holding strings, integers, ``None`` and durations, both paths
+    produce the same bytes. They are not interchangeable in general: large or small
+    floats are spelled differently (``1e16`` against ``1e+16``), NaN and infinity
+    become ``null`` with ``orjson`` only, and ``orjson`` rejects non-string dict keys
+    that ``json`` converts to strings.
+
+    :param value: The value to serialize.
+    :type value: Any
+    :return: The JSON document as UTF-8 bytes.
+    :rtype: bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
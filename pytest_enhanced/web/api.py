@@ -1,12 +1,186 @@
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
-from ..storage import fetch_all_runs, fetch_tests_for_run, fetch_flaky_tests, fetch_slowest_tests
+from __future__ import annotations
 
-app = FastAPI(title="Pytest Enhanced Dashboard", version="0.1")
+import contextlib
+import functools
+from typing import (
+    Annotated,
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+)
+
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from ..storage import (
+    RUN_FIELDS,
+    TEST_FIELDS,
+    data_stamp,
+    ensure_db,
+    fetch_flaky_stats,
+    fetch_slowest_tests,
+    iter_run_rows,
+    iter_test_rows,
+    open_connection,
+)
+from ..utils import dumps_json
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+JSON_MEDIA_TYPE = "application/json"
+
+# Number of encoded response bodies kept per cached endpoint
+RESPONSE_CACHE_SIZE = 128
+
+# Sections that ``/runs/{run_id}?include=...`` can add to its header line
+RUN_INCLUDES = ("slow", "flaky")
+
+# Type of the ``If-None-Match`` request header parameter of the data endpoints
+IfNoneMatch = Annotated[Optional[str], Header()]
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with ``utils.dumps_json``, which uses ``orjson`` when it
+    is installed (the "fast" extra) and the standard library otherwise. Unlike
+    FastAPI's ``ORJSONResponse`` it does not require ``orjson``, so it can be the
+    default response class of the app in every installation.
+    """
+
+    def render(self, content: Any) -> bytes:
+        """
+        Encodes the response content as compact UTF-8 JSON.
+
+        :param content: The value returned by the endpoint.
+        :type content: Any
+        :return: The encoded JSON body.
+        :rtype: bytes
+        """
+        return dumps_json(content)
+
+
+def _warm_up() -> None:
+    """
+    Prepares the database before the app serves its first request: creates or
+    migrates the schema with ``ensure_db`` and reads the database stamp, which
+    opens and configures a connection and loads the schema and the first pages.
+
+    :return: None
+    """
+    ensure_db()
+    data_stamp()
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Runs ``_warm_up`` in the threadpool when the server starts, so the first request
+    does not pay for setting up the database. Every worker process of the server
+    runs it, which also makes sure the schema is current when the app is served
+    without going through the CLI.
+
+    :param app: The application being started.
+    :type app: FastAPI
+    :return: An async iterator that yields once the app is ready.
+    :rtype: AsyncIterator[None]
+    """
+    await run_in_threadpool(_warm_up)
+    yield
+
+
+app = FastAPI(
+    title="Pytest Enhanced Dashboard",
+    version="0.1",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
+)
+
+
+def _ndjson_lines(rows: Iterable, header: Optional[Dict] = None) -> Iterator[bytes]:
+    """
+    Encodes rows as newline-delimited JSON, one value per line, optionally preceded
+    by a header object. Rows are encoded as they are produced, so a response built
+    on this generator starts with the first row and never holds the whole result.
+
+    :param rows: The values to encode, typically tuples read lazily from a cursor.
+    :type rows: Iterable
+    :param header: An optional object written as the first line.
+    :type header: Optional[Dict]
+    :return: An iterator of encoded lines, each ending with a newline.
+    :rtype: Iterator[bytes]
+    """
+    if header is not None:
+        yield dumps_json(header) + b"\n"
+    for row in rows:
+        yield dumps_json(row) + b"\n"
+
+
+def _stream_rows(
+        rows: Callable[..., Iterator[Tuple]],
+        *args: Any,
+        header: Dict,
+) -> Iterator[bytes]:
+    """
+    Encodes the rows of a storage iterator as ``_ndjson_lines`` does, reading them
+    through a connection opened for this stream alone and closed once it ends or is
+    abandoned. ``StreamingResponse`` advances the stream from the threadpool, so
+    consecutive steps may run on different threads; the cached connection of any
+    one of them must not hold the open cursor.
+
+    :param rows: The storage iterator, called with ``*args`` and ``conn``.
+    :type rows: Callable[..., Iterator[Tuple]]
+    :param args: The positional arguments of ``rows``.
+    :param header: The object written as the first line.
+    :type header: Dict
+    :return: An iterator of encoded lines, each ending with a newline.
+    :rtype: Iterator[bytes]
+    """
+    conn = open_connection()
+    try:
+        yield from _ndjson_lines(rows(*args, conn=conn), header=header)
+    finally:
+        conn.close()
+
+
+def _etag(stamp: Tuple) -> str:
+    """
+    Builds the entity tag of a response computed for a database state. Every data
+    endpoint responds identically while ``storage.data_stamp`` is unchanged, so the
+    stamp alone identifies the body; the database path is left out of the tag.
+
+    :param stamp: The database state, as returned by ``data_stamp``.
+    :type stamp: Tuple
+    :return: A weak entity tag.
+    :rtype: str
+    """
+    return 'W/"' + "-".join(str(part) for part in stamp[1:]) + '"'
+
+
+def _not_modified(etag: str, if_none_match: Optional[str]) -> Optional[Response]:
+    """
+    Answers a conditional request whose ``If-None-Match`` header matches ``etag``.
+
+    :param etag: The entity tag of the current response.
+    :type etag: str
+    :param if_none_match: The value of the request's ``If-None-Match`` header, if any.
+    :type if_none_match: Optional[str]
+    :return: An empty 304 response if the client's copy is current, otherwise None.
+    :rtype: Optional[Response]
+    """
+    if if_none_match is None:
+        return None
+    tags = {tag.strip() for tag in if_none_match.split(",")}
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
 
 
 @app.get("/")
-def index():
+async def index():
     """
     Handles the root endpoint of the application.
 
@@ -20,74 +194,202 @@ def index():
 
 
 @app.get("/runs")
-def get_runs(limit: int = 20):
+async def get_runs(limit: int = 20, if_none_match: IfNoneMatch = None):
     """
-    Fetches and returns a list of available runs. The number of runs returned
-    can be controlled using the `limit` parameter.
+    Streams the available runs, newest first, as newline-delimited JSON in columnar
+    form: the first line is ``{"columns": [...]}`` with the names of
+    ``RUN_FIELDS``, and every following line is the array of one run's values in
+    that order. Not repeating the keys on every row keeps the response small and
+    spares building a dictionary per run. Besides its start and finish times, every
+    run carries its total, passed, failed and skipped counts, so a dashboard needs
+    no request per run. The number of runs returned can be controlled using the
+    `limit` parameter. Apart from the database stamp, no query runs in the handler
+    itself: ``StreamingResponse`` pulls the lazy rows from the threadpool while
+    sending them, so the event loop is never blocked by SQLite. The rows are read
+    through a connection opened for the stream, see ``_stream_rows``.
+
+    Like every data endpoint, the response carries an ``ETag`` derived from the
+    database state, and a request whose ``If-None-Match`` header matches it gets an
+    empty 304 response without any rows being read.
 
     :param limit: Specifies the maximum number of runs to fetch.
     :type limit: int
-    :return: A dictionary containing a list of runs.
-    :rtype: dict
+    :param if_none_match: The ``If-None-Match`` request header.
+    :type if_none_match: Optional[str]
+    :return: A streaming NDJSON response with a header line and one run per line, or
+        a 304 response.
+    :rtype: Response
     """
-    runs = fetch_all_runs(limit=limit)
-    return {"runs": runs}
+    etag = _etag(await run_in_threadpool(data_stamp))
+    not_modified = _not_modified(etag, if_none_match)
+    if not_modified is not None:
+        return not_modified
+    lines = _stream_rows(iter_run_rows, limit, header={"columns": RUN_FIELDS})
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE, headers={"ETag": etag})
 
 
 @app.get("/runs/{run_id}")
-def get_run_details(run_id: int):
+async def get_run_details(run_id: int, include: str = "", if_none_match: IfNoneMatch = None):
     """
     Fetch the details of a test run by its unique identifier.
 
-    This endpoint retrieves information about a specific test run, including
-    its associated tests. The response includes the run ID and a list of
-    tests related to the specified run.
+    This endpoint streams information about a specific test run as newline-delimited
+    JSON: the first line is ``{"run_id": ..., "columns": [...]}``, followed by one
+    line per test of the run holding the array of its ``TEST_FIELDS`` values, in
+    the columnar form described in ``get_runs``. Tests are read from the database
+    in chunks while the response is being sent, so memory use does not grow with
+    the size of the run. As for ``get_runs``, the reads happen in the threadpool,
+    not on the event loop, through a connection owned by the stream.
+
+    The ``include`` parameter takes a comma-separated list of ``RUN_INCLUDES`` and
+    adds the matching views to the header line, so a dashboard gets them in the
+    same round-trip: ``slow`` adds ``"slowest"`` as returned by ``/slow/{run_id}``
+    and ``flaky`` adds ``"flaky"`` as returned by ``/flaky``.
 
     :param run_id: Identifier for the test run to retrieve details for.
     :type run_id: int
-    :return: A dictionary containing the test run ID and the associated tests.
-    :rtype: dict
+    :param include: Comma-separated sections to add to the header line.
+    :type include: str
+    :param if_none_match: The ``If-None-Match`` request header, see ``get_runs``.
+    :type if_none_match: Optional[str]
+    :raises HTTPException: With status 400 if ``include`` names an unknown section.
+    :return: A streaming NDJSON response with a header line and one test per line,
+        or a 304 response.
+    :rtype: Response
     """
-    tests = fetch_tests_for_run(run_id)
-    return {"run_id": run_id, "tests": tests}
+    sections = {name.strip() for name in include.split(",") if name.strip()}
+    unknown = sections.difference(RUN_INCLUDES)
+    if unknown:
+        raise HTTPException(400, f"Unknown include: {', '.join(sorted(unknown))}")
+
+    stamp = await run_in_threadpool(data_stamp)
+    etag = _etag(stamp)
+    not_modified = _not_modified(etag, if_none_match)
+    if not_modified is not None:
+        return not_modified
+
+    header = {"run_id": run_id, "columns": TEST_FIELDS}
+    if sections:
+        extras = await run_in_threadpool(_run_header_extras, run_id, frozenset(sections), stamp)
+        header.update(extras)
+    lines = _stream_rows(iter_test_rows, run_id, header=header)
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE, headers={"ETag": etag})
+
+
+def _run_header_extras(run_id: int, sections: frozenset, stamp: Tuple) -> Dict:
+    """
+    Computes the sections requested through ``include`` for ``get_run_details``.
+    The slowest tests come from a memoized index scan and the flaky tests from the
+    precomputed `test_stats` table, so neither aggregates the result history.
+
+    :param run_id: The unique identifier of the test run.
+    :type run_id: int
+    :param sections: The requested sections, a subset of ``RUN_INCLUDES``.
+    :type sections: frozenset
+    :param stamp: The database state the request's ETag was built from.
+    :type stamp: Tuple
+    :return: The entries to add to the header line.
+    :rtype: Dict
+    """
+    extras: Dict[str, Any] = {}
+    if "slow" in sections:
+        extras["slowest"] = fetch_slowest_tests(run_id, limit=10, stamp=stamp)
+    if "flaky" in sections:
+        extras["flaky"] = fetch_flaky_stats(min_failures=2)
+    return extras
 
 
 @app.get("/flaky")
-def get_flaky():
+async def get_flaky(if_none_match: IfNoneMatch = None):
     """
     Fetches a list of flaky tests based on specific criteria.
 
     The function retrieves a list of flaky tests observed within a defined
     time window and meeting a minimum failure threshold. Flaky tests are
     those that fail inconsistently and thus need to be tracked for further
-    analysis or resolution.
+    analysis or resolution. They are read from the `test_stats` table, which
+    ``finish_run`` keeps up to date for the last ``FLAKY_WINDOW`` runs, so a
+    request only reads the qualifying rows, like the `flaky` CLI command. The cache
+    lookup and any query run in the threadpool, so the event loop keeps accepting
+    connections while SQLite works. Conditional requests are answered with 304 as
+    described in ``get_runs``.
 
+    :param if_none_match: The ``If-None-Match`` request header.
+    :type if_none_match: Optional[str]
     :raises ValueError: If any of the parameters in the fetching function
                         are invalid or if the fetching process fails.
     :raises RuntimeError: If there is an unexpected issue during data
                           retrieval or processing.
 
-    :return: A dictionary containing the list of flaky tests that satisfy
-             the specified criteria.
-    :rtype: dict
+    :return: A JSON response with the list of flaky tests that satisfy
+             the specified criteria under the "flaky" key, or a 304 response.
+    :rtype: Response
+    """
+    stamp = await run_in_threadpool(data_stamp)
+    etag = _etag(stamp)
+    not_modified = _not_modified(etag, if_none_match)
+    if not_modified is not None:
+        return not_modified
+    body = await run_in_threadpool(_flaky_body, stamp)
+    return Response(body, media_type=JSON_MEDIA_TYPE, headers={"ETag": etag})
+
+
+@functools.lru_cache(maxsize=RESPONSE_CACHE_SIZE)
+def _flaky_body(stamp: Tuple) -> bytes:
+    """
+    Encodes the body of ``get_flaky``. Bodies are cached per database state (see
+    ``storage.data_stamp``), so repeated requests skip both the query and the JSON
+    encoding until new runs or results are written, by any process.
+
+    :param stamp: The database state the body is computed for; only the cache key.
+    :type stamp: Tuple
+    :return: The encoded JSON body.
+    :rtype: bytes
     """
-    data = fetch_flaky_tests(window=30, min_failures=2)
-    return {"flaky": data}
+    data = fetch_flaky_stats(min_failures=2)
+    return dumps_json({"flaky": data})
 
 
 @app.get("/slow/{run_id}")
-def get_slowest(run_id: int):
+async def get_slowest(run_id: int, if_none_match: IfNoneMatch = None):
     """
     Fetches the slowest tests for a given run.
 
     Retrieves and returns the details of the slowest tests associated
     with a specific test run ID. The number of tests returned is limited
-    to the top 10 slowest.
+    to the top 10 slowest. Like ``get_flaky``, the database work runs in the
+    threadpool and conditional requests are answered with 304.
 
     :param run_id: The unique identifier of the test run.
     :type run_id: int
-    :return: A dictionary containing the run ID and a list of the slowest tests.
-    :rtype: dict
+    :param if_none_match: The ``If-None-Match`` request header.
+    :type if_none_match: Optional[str]
+    :return: A JSON response with the run ID and a list of the slowest tests, or a
+        304 response.
+    :rtype: Response
+    """
+    stamp = await run_in_threadpool(data_stamp)
+    etag = _etag(stamp)
+    not_modified = _not_modified(etag, if_none_match)
+    if not_modified is not None:
+        return not_modified
+    body = await run_in_threadpool(_slowest_body, stamp, run_id)
+    return Response(body, media_type=JSON_MEDIA_TYPE, headers={"ETag": etag})
+
+
+@functools.lru_cache(maxsize=RESPONSE_CACHE_SIZE)
+def _slowest_body(stamp: Tuple, run_id: int) -> bytes:
+    """
+    Encodes the body of ``get_slowest``, cached per database state and run ID like
+    ``_flaky_body``.
+
+    :param stamp: The database state the body is computed for; the cache key, also
+        passed on to ``fetch_slowest_tests``.
+    :type stamp: Tuple
+    :param run_id: The unique identifier of the test run.
+    :type run_id: int
+    :return: The encoded JSON body.
+    :rtype: bytes
     """
-    data = fetch_slowest_tests(run_id, limit=10)
-    return {"run_id": run_id, "slowest": data}
+    data = fetch_slowest_tests(run_id, limit=10, stamp=stamp)
+    return dumps_json({"run_id": run_id, "slowest": data})
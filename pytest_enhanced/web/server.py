@@ -1,16 +1,33 @@
 import uvicorn
-from .api import app
 
-def run_server(host: str = "127.0.0.1", port: int = 8000):
+# Import string of the ASGI app; uvicorn needs a string rather than the app object
+# to start more than one worker process
+APP_TARGET = "pytest_enhanced.web.api:app"
+
+
+def run_server(host: str = "127.0.0.1", port: int = 8000, workers: int = 1):
     """
     Starts and runs an ASGI server using Uvicorn.
 
     This function is used to run an ASGI application on the specified host and port,
     providing network availability for client requests. It utilizes Uvicorn as the
-    ASGI server implementation.
+    ASGI server implementation. The event loop and HTTP parser are left on "auto",
+    so uvloop and httptools are used when installed (the "web" extra) and the pure
+    Python implementations otherwise. Access logging is disabled and only warnings
+    are logged, which keeps per-request logging out of the hot path.
 
     :param host: Host address for the server, defaults to "127.0.0.1".
     :param port: Port number for the server, defaults to 8000.
+    :param workers: Number of worker processes, defaults to 1.
     :return: None.
     """
-    uvicorn.run(app, host=host, port=port)
+    uvicorn.run(
+        APP_TARGET,
+        host=host,
+        port=port,
+        workers=workers,
+        loop="auto",
+        http="auto",
+        access_log=False,
+        log_level="warning",
+    )
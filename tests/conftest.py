@@ -0,0 +1,29 @@
+import pytest
+from typer.testing import CliRunner
+
+from pytest_enhanced import storage
+
+
+@pytest.fixture(scope="session")
+def runner():
+    """
+    Provides one CLI runner for the whole session. A runner keeps no state between
+    ``invoke`` calls, so tests can share it instead of building their own.
+
+    :return: The shared runner.
+    :rtype: CliRunner
+    """
+    return CliRunner()
+
+
+@pytest.fixture(autouse=True)
+def _close_cached_connection():
+    """
+    Closes the connection cached by the storage layer after every test. Tests change
+    into their own temporary directory, so a connection left open would otherwise keep
+    the previous test's database open until the next storage call of the same thread.
+
+    :return: None
+    """
+    yield
+    storage.close_connection()
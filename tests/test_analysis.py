@@ -48,3 +48,88 @@ def test_session_stats_basic(tmp_path, monkeypatch):
     assert "slow_tests" in stats
     assert "flaky_tests" in stats
     assert "history" in stats
+
+
+def test_flaky_tests_counts_flips(tmp_path, monkeypatch):
+    """
+    Verifies that `get_flaky_tests` reports failure counts, total runs and the number
+    of outcome flips for a test that alternates between passing and failing, while a
+    consistently passing test is left out.
+
+    :param tmp_path: Temporary file path fixture for creating isolated file storage for
+        the test run.
+    :param monkeypatch: Monkeypatch fixture used to change the working directory.
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+
+    for status in ("passed", "failed", "passed", "failed"):
+        run_id = storage.start_run()
+        storage.record_test_result(run_id, "t_flaky", status, 0.1, None)
+        storage.record_test_result(run_id, "t_stable", "passed", 0.1, None)
+        storage.finish_run(run_id)
+
+    assert analysis.get_flaky_tests() == [("t_flaky", 2, 4, 3, 50.0)]
+
+
+def test_session_stats_cached_per_run(tmp_path, monkeypatch):
+    """
+    Verifies that `get_session_stats` reuses the computed statistics while the
+    database is unchanged, hands every caller its own copy of them, and recomputes
+    them once new results are written or a finished run rebuilds the flaky stats.
+
+    :param tmp_path: Temporary file path fixture for creating isolated file storage for
+        the test run.
+    :param monkeypatch: Monkeypatch fixture used to change the working directory.
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+
+    run_id = storage.start_run()
+    storage.record_test_result(run_id, "t1", "passed", 0.5, None)
+    storage.flush_results()
+
+    first = analysis.get_session_stats()
+    first["summary"]["total"] = 99
+    first["slow_tests"].clear()
+    hits = analysis._compute_session_stats.cache_info().hits
+    second = analysis.get_session_stats()
+    assert analysis._compute_session_stats.cache_info().hits == hits + 1
+    assert second["summary"]["total"] == 1
+    assert second["slow_tests"] == [("t1", 0.5)]
+    assert analysis.get_session_stats() == second
+
+    storage.record_test_result(run_id, "t2", "failed", 0.5, "boom")
+    storage.flush_results()
+    assert analysis.get_session_stats()["summary"]["total"] == 2
+
+    storage.finish_run(run_id)
+    run_id = storage.start_run()
+    storage.record_test_result(run_id, "t2", "failed", 0.5, "boom")
+    storage.flush_results()
+    assert analysis.get_session_stats()["flaky_tests"] == []
+
+    # finishing the run rebuilds the flaky stats but leaves the run's counts as they are
+    storage.finish_run(run_id)
+    assert analysis.get_session_stats()["flaky_tests"] == [("t2", 2, 2, 0, 100.0)]
+
+
+def test_session_stats_pass_rate_without_results(tmp_path, monkeypatch):
+    """
+    Verifies that a run without any recorded results reports no pass rate instead
+    of a misleading 0%.
+
+    :param tmp_path: Temporary file path fixture for creating isolated file storage for
+        the test run.
+    :param monkeypatch: Monkeypatch fixture used to change the working directory.
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+    storage.finish_run(storage.start_run())
+
+    stats = analysis.get_session_stats()
+    assert stats["summary"]["total"] == 0
+    assert stats["pass_rate"] is None
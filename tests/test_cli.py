@@ -1,10 +1,8 @@
-from typer.testing import CliRunner
-
 from pytest_enhanced import storage
 from pytest_enhanced.cli import app
 
 
-def test_cli_report_no_data(tmp_path, monkeypatch):
+def test_cli_report_no_data(runner, tmp_path, monkeypatch):
     """
     Test the "report" command of the CLI when no data exists in the database.
 
@@ -13,6 +11,7 @@ def test_cli_report_no_data(tmp_path, monkeypatch):
     the command exits with a non-zero exit code and outputs the appropriate
     message informing the user that no test runs were found.
 
+    :param runner: The shared CLI runner.
     :param tmp_path: Temporary file path provided by the pytest fixture.
     :type tmp_path: pathlib.Path
     :param monkeypatch: Fixture to patch and modify functionalities or
@@ -22,18 +21,18 @@ def test_cli_report_no_data(tmp_path, monkeypatch):
     monkeypatch.chdir(tmp_path)
     storage.ensure_db()
 
-    runner = CliRunner()
     result = runner.invoke(app, ["report"])
     assert result.exit_code != 0
     assert "No test runs found" in result.stdout
 
 
-def test_cli_report_with_data(tmp_path, monkeypatch):
+def test_cli_report_with_data(runner, tmp_path, monkeypatch):
     """
     Function to test the CLI report generation with recorded data in the storage system.
     This function simulates a test scenario where test results are persisted,
     retrieved, and reported using the CLI application.
 
+    :param runner: The shared CLI runner.
     :param tmp_path: Temporary directory path provided as a fixture.
     :type tmp_path: pathlib.Path
     :param monkeypatch: pytest fixture used for safely patching and modifying behavior during the test.
@@ -48,7 +47,6 @@ def test_cli_report_with_data(tmp_path, monkeypatch):
     storage.record_test_result(run_id, "t2", "failed", 1.0, "bad")
     storage.finish_run(run_id)
 
-    runner = CliRunner()
     result = runner.invoke(app, ["report"])
 
     # Should succeed
@@ -56,3 +54,97 @@ def test_cli_report_with_data(tmp_path, monkeypatch):
     assert "Pytest Enhanced Report" in result.stdout
     assert "Passed:" in result.stdout
     assert "Failed:" in result.stdout
+
+
+def test_cli_export_csv_and_json(runner, tmp_path, monkeypatch):
+    """
+    Test the "export" command for both supported formats. The exported files must
+    contain one entry per recorded test result, in the fixed column order.
+
+    :param runner: The shared CLI runner.
+    :param tmp_path: Temporary directory path provided as a fixture.
+    :type tmp_path: pathlib.Path
+    :param monkeypatch: pytest fixture used for safely patching and modifying behavior
+        during the test.
+    :type monkeypatch: pytest.MonkeyPatch
+    :return: None
+    """
+    import csv
+    import json
+
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+
+    run_id = storage.start_run()
+    storage.record_test_result(run_id, "t1", "passed", 0.2, None)
+    storage.record_test_result(run_id, "t2", "failed", 1.0, "bad")
+    storage.finish_run(run_id)
+
+    result = runner.invoke(app, ["export", "--format", "csv", "--output", "out.csv"])
+    assert result.exit_code == 0
+    with open(tmp_path / "out.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["test_name"] for r in rows] == ["t1", "t2"]
+    assert list(rows[0].keys())[:2] == ["run_id", "started_at"]
+
+    result = runner.invoke(app, ["export", "--format", "json", "--output", "out.json"])
+    assert result.exit_code == 0
+    data = json.loads((tmp_path / "out.json").read_text(encoding="utf-8"))
+    assert [r["status"] for r in data] == ["passed", "failed"]
+    assert data[1]["error_message"] == "bad"
+
+
+def test_cli_flaky_and_slow(runner, tmp_path, monkeypatch):
+    """
+    Test the "flaky" and "slow" commands render their tables when matching data
+    exists in the database.
+
+    :param runner: The shared CLI runner.
+    :param tmp_path: Temporary directory path provided as a fixture.
+    :type tmp_path: pathlib.Path
+    :param monkeypatch: pytest fixture used for safely patching and modifying behavior
+        during the test.
+    :type monkeypatch: pytest.MonkeyPatch
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+
+    for _ in range(2):
+        run_id = storage.start_run()
+        storage.record_test_result(run_id, "t_flaky", "failed", 1.5, "bad")
+        storage.finish_run(run_id)
+
+    result = runner.invoke(app, ["flaky"])
+    assert result.exit_code == 0
+    assert "t_flaky" in result.stdout
+    assert "100.0%" in result.stdout
+
+    result = runner.invoke(app, ["slow"])
+    assert result.exit_code == 0
+    assert "1.50s" in result.stdout
+
+
+def test_cli_web_passes_server_options(runner, tmp_path, monkeypatch):
+    """
+    Test that the `web` command starts uvicorn with the app import string, the
+    requested number of workers and access logging disabled.
+
+    :param runner: The shared CLI runner.
+    :param tmp_path: Temporary directory path provided as a fixture.
+    :param monkeypatch: pytest fixture used to replace ``uvicorn.run``.
+    :return: None
+    """
+    from pytest_enhanced.web import server
+
+    monkeypatch.chdir(tmp_path)
+    calls = []
+    monkeypatch.setattr(server.uvicorn, "run", lambda *args, **kwargs: calls.append((args, kwargs)))
+
+    result = runner.invoke(app, ["web", "--port", "8123", "--workers", "2"])
+    assert result.exit_code == 0
+    (args, kwargs), = calls
+    assert args == (server.APP_TARGET,)
+    assert kwargs["port"] == 8123
+    assert kwargs["workers"] == 2
+    assert kwargs["access_log"] is False
@@ -0,0 +1,86 @@
+import threading
+
+from pytest_enhanced import storage
+
+pytest_plugins = ["pytester"]
+
+
+def test_plugin_records_results(pytester):
+    """
+    Run a small test suite with the `--enhanced` flag and verify that every test
+    outcome, together with its error text, ends up in the database.
+
+    :param pytester: Pytest fixture used to create and run an isolated test suite.
+    :return: None
+    """
+    pytester.makepyfile(
+        """
+        import pytest
+
+        def test_ok():
+            assert True
+
+        def test_bad():
+            assert 1 == 2
+
+        def test_skipped():
+            pytest.skip("not today")
+        """
+    )
+    result = pytester.runpytest("--enhanced", "-p", "no:cacheprovider")
+    result.assert_outcomes(passed=1, failed=1, skipped=1)
+
+    run_id = storage.fetch_last_run_id()
+    tests = {t["test_name"].split("::")[-1]: t for t in storage.fetch_tests_for_run(run_id)}
+    assert tests["test_ok"]["status"] == "passed"
+    assert tests["test_ok"]["error_message"] is None
+    assert tests["test_bad"]["status"] == "failed"
+    assert "assert 1 == 2" in tests["test_bad"]["error_message"]
+    assert tests["test_skipped"]["status"] == "skipped"
+    assert "not today" in tests["test_skipped"]["error_message"]
+
+
+def test_plugin_session_shares_one_connection(pytester, monkeypatch):
+    """
+    Run a small test suite with the `--enhanced` flag and verify that the hooks of the
+    session reuse the database connection instead of opening the file per call: the
+    hooks open exactly one connection and every storage call they make uses it. The
+    storage worker writes through its own connection on its own thread.
+
+    :param pytester: Pytest fixture used to create and run an isolated test suite.
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    opened = []
+    used = []
+    connect = storage.sqlite3.connect
+    get_connection = storage.get_connection
+
+    def counting_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        if threading.current_thread() is threading.main_thread():
+            opened.append(conn)
+        return conn
+
+    def recording_get_connection():
+        conn = get_connection()
+        used.append(conn)
+        return conn
+
+    monkeypatch.setattr(storage.sqlite3, "connect", counting_connect)
+    monkeypatch.setattr(storage, "get_connection", recording_get_connection)
+    pytester.makepyfile(
+        """
+        def test_one():
+            pass
+
+        def test_two():
+            pass
+        """
+    )
+    result = pytester.runpytest("--enhanced", "-p", "no:cacheprovider")
+    result.assert_outcomes(passed=2)
+    assert len(opened) == 1
+    assert used
+    assert all(conn is opened[0] for conn in used)
@@ -0,0 +1,22 @@
+from pytest_enhanced import report
+
+
+def test_render_history_caps_detail_lines(capsys):
+    """
+    Verifies that the pass rate history keeps one trend block per run but limits the
+    per-run detail lines to the newest runs, summarizing the rest.
+
+    :param capsys: Pytest fixture capturing everything written to stdout.
+    :return: None
+    """
+    count = report.MAX_HISTORY_DETAILS + 5
+    history = [(run_id, 100.0 if run_id % 2 else 50.0) for run_id in range(count, 0, -1)]
+
+    report._render_history(history)
+    out = capsys.readouterr().out
+
+    assert "… 5 earlier runs" in out
+    assert f"Run {count}: 100.0%" in out
+    assert "Run 5: 100.0%" not in out
+    assert "Run 6: 50.0%" in out
+    assert out.count("🟩") + out.count("🟥") == count
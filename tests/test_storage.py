@@ -1,7 +1,10 @@
 import os
 import sqlite3
+import threading
 from pathlib import Path
 
+import pytest
+
 from pytest_enhanced import storage
 
 
@@ -33,3 +36,471 @@ def test_db_creation_tmpdir(tmp_path, monkeypatch):
     assert "test_runs" in tables
     assert "test_results" in tables
     conn.close()
+
+
+def test_record_test_results_batch(tmp_path, monkeypatch):
+    """
+    Test that a batch of results written through `record_test_results` is stored
+    in full and attributed to the correct test run.
+
+    :param tmp_path: Temporary path provided for storing files during the test.
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+
+    run_id = storage.start_run()
+    storage.record_test_results([
+        (run_id, "t1", "passed", 0.1, None),
+        (run_id, "t2", "failed", 0.2, "boom"),
+        (run_id, "t3", "skipped", 0.0, "skip"),
+    ])
+    storage.finish_run(run_id)
+
+    tests = storage.fetch_tests_for_run(run_id)
+    assert [t["test_name"] for t in tests] == ["t1", "t2", "t3"]
+    assert storage.fetch_run_summary(run_id) == {"total": 3, "passed": 1, "failed": 1, "skipped": 1}
+
+
+def test_fetch_export_rows_limits_runs(tmp_path, monkeypatch):
+    """
+    Test that `fetch_export_rows` joins results with their run, returns only the
+    requested number of most recent runs, and orders them newest first.
+
+    :param tmp_path: Temporary path provided for storing files during the test.
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+
+    for name in ("old", "mid", "new"):
+        run_id = storage.start_run()
+        storage.record_test_result(run_id, name, "passed", 0.1, None)
+        storage.finish_run(run_id)
+
+    rows = [dict(zip(storage.EXPORT_FIELDS, r)) for r in storage.fetch_export_rows(limit=2)]
+    assert [(r["run_id"], r["test_name"]) for r in rows] == [(3, "new"), (2, "mid")]
+    assert rows[0]["error_message"] == ""
+    assert rows[0]["finished_at"]
+
+
+def test_slowest_query_uses_index(tmp_path, monkeypatch):
+    """
+    Test that `ensure_db` creates the result indexes and that the slowest-tests
+    lookup is answered by an index search rather than a table scan.
+
+    :param tmp_path: Temporary path provided for storing files during the test.
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+
+    conn = storage.get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT name FROM sqlite_master WHERE type='index'")
+    indexes = {row[0] for row in cur.fetchall()}
+    assert {"idx_results_name_run", "idx_results_run_duration", "idx_results_run_status"} <= indexes
+
+    cur.execute("EXPLAIN QUERY PLAN " + storage._SQL_SLOWEST, (1, 5))
+    plan = " ".join(row[3] for row in cur.fetchall())
+    assert "USING INDEX idx_results_run_duration" in plan
+    assert "TEMP B-TREE" not in plan
+
+    cur.execute("EXPLAIN QUERY PLAN " + storage._SQL_SUMMARY, (1,))
+    plan = " ".join(row[3] for row in cur.fetchall())
+    assert "USING COVERING INDEX idx_results_run_status" in plan
+
+    cur.execute("EXPLAIN QUERY PLAN " + storage._SQL_PASS_RATE, (10,))
+    plan = " ".join(row[3] for row in cur.fetchall())
+    assert "USING COVERING INDEX idx_results_run_status" in plan
+
+    cur.execute("EXPLAIN QUERY PLAN " + storage._SQL_ALL_RUNS, (10,))
+    plan = " ".join(row[3] for row in cur.fetchall())
+    assert "USING COVERING INDEX idx_results_run_status" in plan
+    storage.close_connection()
+
+
+def test_test_stats_refreshed_and_backfilled(tmp_path, monkeypatch):
+    """
+    Test that finishing a run rebuilds the persisted `test_stats` table, and that
+    `ensure_db` backfills it for a database that holds results but no stats yet.
+
+    :param tmp_path: Temporary path provided for storing files during the test.
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+
+    for status in ("failed", "failed", "passed"):
+        run_id = storage.start_run()
+        storage.record_test_result(run_id, "t1", status, 0.1, None)
+        storage.finish_run(run_id)
+
+    assert storage.fetch_flaky_stats() == [("t1", 2, 3, 1, 66.7)]
+
+    # simulate a database written by a version without test_stats
+    conn = storage.get_connection()
+    conn.execute("DELETE FROM test_stats")
+    conn.execute("PRAGMA user_version = 0")
+    assert storage.fetch_flaky_stats() == []
+
+    storage.ensure_db()
+    assert storage.fetch_flaky_stats() == [("t1", 2, 3, 1, 66.7)]
+    assert storage.fetch_flaky_tests() == [("t1", 2, 3)]
+    with pytest.warns(UserWarning, match="window=30 is ignored"):
+        assert storage.fetch_flaky_tests(window=30) == [("t1", 2, 3)]
+
+
+def test_db_uses_wal_journal(tmp_path, monkeypatch):
+    """
+    Test that `ensure_db` creates the database with the configured page size and
+    switches it to the WAL journal, and that new connections use the relaxed
+    synchronous mode.
+
+    :param tmp_path: Temporary path provided for storing files during the test.
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+
+    conn = storage.get_connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA page_size").fetchone()[0] == storage.PAGE_SIZE
+
+
+def test_fetch_latest_summary(tmp_path, monkeypatch):
+    """
+    Test that `fetch_latest_summary` returns None for an empty database, zero counts
+    for a run without results, and per-status counts for the newest run only.
+
+    :param tmp_path: Temporary path provided for storing files during the test.
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+    assert storage.fetch_latest_summary() is None
+
+    old = storage.start_run()
+    storage.record_test_result(old, "t1", "failed", 0.1, "boom")
+    new = storage.start_run()
+    assert storage.fetch_latest_summary() == {
+        "run_id": new, "total": 0, "passed": 0, "failed": 0, "skipped": 0, "pass_rate": None,
+    }
+
+    storage.record_test_result(new, "t1", "passed", 0.1, None)
+    storage.record_test_result(new, "t2", "skipped", 0.0, "skip")
+    storage.flush_results()
+    assert storage.fetch_latest_summary() == {
+        "run_id": new, "total": 2, "passed": 1, "failed": 0, "skipped": 1, "pass_rate": 50.0,
+    }
+
+
+def test_record_test_result_written_by_worker(tmp_path, monkeypatch):
+    """
+    Test that results passed to `record_test_result` are written by the storage worker
+    once `flush_results` or `finish_run` is called.
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+
+    run_id = storage.start_run()
+    storage.record_test_result(run_id, "t1", "passed", 0.1, None)
+    storage.flush_results()
+    storage.flush_results()
+    assert [row["test_name"] for row in storage.fetch_tests_for_run(run_id)] == ["t1"]
+
+    storage.record_test_result(run_id, "t2", "failed", 0.2, "boom")
+    storage.finish_run(run_id)
+    assert [row["test_name"] for row in storage.fetch_tests_for_run(run_id)] == ["t1", "t2"]
+
+
+def test_flush_results_reports_worker_errors(tmp_path, monkeypatch):
+    """
+    Test that a failed write in the storage worker is raised by the next
+    `flush_results` call and that the worker keeps running afterwards.
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+
+    run_id = storage.start_run()
+    storage.record_test_result(run_id, None, "passed", 0.1, None)
+    with pytest.raises(sqlite3.IntegrityError):
+        storage.flush_results()
+
+    storage.record_test_result(run_id, "t1", "passed", 0.1, None)
+    storage.flush_results()
+    assert [row["test_name"] for row in storage.fetch_tests_for_run(run_id)] == ["t1"]
+
+
+def test_worker_reopens_after_failed_connect(tmp_path, monkeypatch):
+    """
+    Test that when the storage worker fails to open the database of a new working
+    directory, the failure is reported once and a later batch for the previous
+    directory opens its database again instead of writing through the connection
+    closed before the failed open.
+    """
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    monkeypatch.chdir(tmp_path / "a")
+    storage.ensure_db()
+    run_id = storage.start_run()
+    storage.record_test_result(run_id, "t1", "passed", 0.1, None)
+    storage.flush_results()
+
+    monkeypatch.chdir(tmp_path / "b")
+    storage.ensure_db()
+    other_run_id = storage.start_run()
+
+    open_connection = storage._open_connection
+    calls = []
+
+    def failing_once(path):
+        calls.append(path)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("unable to open database file")
+        return open_connection(path)
+
+    monkeypatch.setattr(storage, "_open_connection", failing_once)
+    storage.record_test_result(other_run_id, "lost", "passed", 0.1, None)
+    with pytest.raises(sqlite3.OperationalError):
+        storage.flush_results()
+
+    monkeypatch.chdir(tmp_path / "a")
+    storage.get_connection()
+    storage.record_test_result(run_id, "t2", "passed", 0.1, None)
+    storage.flush_results()
+    assert [row["test_name"] for row in storage.fetch_tests_for_run(run_id)] == ["t1", "t2"]
+
+
+def test_flush_does_not_wait_for_a_stopped_worker(tmp_path, monkeypatch):
+    """
+    Test that `flush` raises instead of blocking when the worker thread is no longer
+    running or does not write the queued results in time, and that the next
+    `record_test_result` starts a new worker.
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+
+    worker = storage.StorageWorker()
+    worker.start()
+    worker.stop()
+    with pytest.raises(RuntimeError):
+        worker.flush(timeout=5)
+
+    release = threading.Event()
+    stuck = storage.StorageWorker()
+    stuck.run = release.wait
+    stuck.start()
+    with pytest.raises(TimeoutError):
+        stuck.flush(timeout=0.2)
+    release.set()
+
+    monkeypatch.setattr(storage, "_worker", worker)
+    run_id = storage.start_run()
+    storage.record_test_result(run_id, "t1", "passed", 0.1, None)
+    storage.flush_results()
+    assert storage._worker is not worker
+    assert [row["test_name"] for row in storage.fetch_tests_for_run(run_id)] == ["t1"]
+
+
+def test_fetch_run_summary_counts_statuses(tmp_path, monkeypatch):
+    """
+    Test that `fetch_run_summary` counts results per status and reports zeros for a
+    run without results.
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+
+    run_id = storage.start_run()
+    assert storage.fetch_run_summary(run_id) == {"total": 0, "passed": 0, "failed": 0, "skipped": 0}
+
+    storage.record_test_results([
+        (run_id, "t1", "passed", 0.1, None),
+        (run_id, "t2", "passed", 0.1, None),
+        (run_id, "t3", "failed", 0.1, "boom"),
+    ])
+    assert storage.fetch_run_summary(run_id) == {"total": 3, "passed": 2, "failed": 1, "skipped": 0}
+
+
+def test_iter_tests_for_run_streams_in_chunks(tmp_path, monkeypatch):
+    """
+    Test that `iter_tests_for_run` yields the same rows as `fetch_tests_for_run`
+    when the run spans several fetch chunks.
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+
+    run_id = storage.start_run()
+    storage.record_test_results([(run_id, f"t{i}", "passed", 0.1, None) for i in range(7)])
+
+    rows = list(storage.iter_tests_for_run(run_id, chunk=3))
+    assert [row["test_name"] for row in rows] == [f"t{i}" for i in range(7)]
+    assert rows == storage.fetch_tests_for_run(run_id)
+
+
+def test_text_statuses_are_migrated(tmp_path, monkeypatch):
+    """
+    Test that `ensure_db` rewrites a results table with text statuses into integer
+    status ids, keeping statuses it does not know about, and converts text run
+    timestamps to integers.
+    """
+    monkeypatch.chdir(tmp_path)
+    data_dir = tmp_path / ".pytest_enhanced"
+    data_dir.mkdir()
+    old = sqlite3.connect(data_dir / storage.DB_FILENAME)
+    old.executescript("""
+        CREATE TABLE test_runs (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at TEXT NOT NULL,
+            finished_at TEXT
+        );
+        CREATE TABLE test_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id INTEGER NOT NULL,
+            test_name TEXT NOT NULL,
+            status TEXT NOT NULL,
+            duration REAL NOT NULL,
+            error_message TEXT
+        );
+        INSERT INTO test_runs (started_at) VALUES ('2024-01-01T00:00:00+00:00');
+        INSERT INTO test_results (run_id, test_name, status, duration, error_message)
+        VALUES (1, 't1', 'passed', 0.1, NULL), (1, 't2', 'failed', 0.2, 'boom'),
+               (1, 't3', 'error', 0.3, 'setup');
+    """)
+    old.close()
+
+    storage.ensure_db()
+
+    conn = storage.get_connection()
+    column = conn.execute(
+        "SELECT type FROM pragma_table_info('test_results') WHERE name = 'status'"
+    )
+    assert column.fetchone()[0] == "INTEGER"
+    assert [(row["test_name"], row["status"]) for row in storage.fetch_tests_for_run(1)] == [
+        ("t1", "passed"), ("t2", "failed"), ("t3", "error"),
+    ]
+    assert storage.fetch_run_summary(1) == {"total": 3, "passed": 1, "failed": 1, "skipped": 0}
+    assert storage.fetch_all_runs() == [
+        {"run_id": 1, "started_at": "2024-01-01T00:00:00+00:00", "finished_at": None,
+         "total": 3, "passed": 1, "failed": 1, "skipped": 0},
+    ]
+
+
+def test_unknown_status_is_rejected(tmp_path, monkeypatch):
+    """
+    Test that recording a result with an unknown status raises a ValueError.
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+
+    run_id = storage.start_run()
+    with pytest.raises(ValueError):
+        storage.record_test_result(run_id, "t1", "exploded", 0.1, None)
+
+
+def test_ensure_db_skips_schema_setup_when_current(tmp_path, monkeypatch):
+    """
+    Test that `ensure_db` records the schema version and does no further work on a
+    database that is already up to date.
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+
+    conn = storage.get_connection()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == storage.SCHEMA_VERSION
+
+    conn.execute("DROP INDEX idx_results_run_status")
+    storage.ensure_db()
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    assert "idx_results_run_status" not in indexes
+
+
+def test_read_queries_memoized_until_next_write(tmp_path, monkeypatch):
+    """
+    Test that repeated read queries are served from the memo, that a new result
+    makes the next call query the database again, and that a stamp passed in by the
+    caller is used instead of taking a new one.
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+
+    run_id = storage.start_run()
+    storage.record_test_results([(run_id, "t1", "passed", 0.5, None)])
+
+    hits = storage._cached_slowest_tests.cache_info().hits
+    assert storage.fetch_slowest_tests(run_id) == [("t1", 0.5)]
+    assert storage.fetch_slowest_tests(run_id) == [("t1", 0.5)]
+    assert storage._cached_slowest_tests.cache_info().hits == hits + 1
+
+    storage.record_test_result(run_id, "t2", "failed", 1.5, "boom")
+    storage.flush_results()
+    assert storage.fetch_slowest_tests(run_id) == [("t2", 1.5), ("t1", 0.5)]
+    assert storage.fetch_run_summary(run_id)["total"] == 2
+
+    stamp = storage.data_stamp()
+    monkeypatch.setattr(storage, "data_stamp", lambda: pytest.fail("stamp taken twice"))
+    assert storage.fetch_slowest_tests(run_id, stamp=stamp) == [("t2", 1.5), ("t1", 0.5)]
+    assert storage.fetch_run_summary(run_id, stamp=stamp)["total"] == 2
+
+
+def test_transaction_retries_while_database_is_locked(tmp_path, monkeypatch):
+    """
+    Test that a write transaction waits for another connection's write lock to be
+    released instead of failing with "database is locked".
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(storage, "BUSY_BACKOFF", 0.01)
+    storage.ensure_db()
+
+    db_path = tmp_path / ".pytest_enhanced" / storage.DB_FILENAME
+    blocker = sqlite3.connect(db_path, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    conn = storage._open_connection(db_path)
+    conn.execute("PRAGMA busy_timeout = 0")
+
+    sleeps = []
+
+    def release(delay):
+        sleeps.append(delay)
+        blocker.execute("COMMIT")
+
+    monkeypatch.setattr(storage.time, "sleep", release)
+    with storage._transaction(conn):
+        conn.execute("INSERT INTO test_runs (started_at) VALUES (0)")
+    assert sleeps == [0.01]
+    assert conn.execute("SELECT COUNT(*) FROM test_runs").fetchone()[0] == 1
+    conn.close()
+    blocker.close()
+
+
+def test_connections_are_not_registered_per_open(tmp_path, monkeypatch):
+    """
+    Test that opening connections does not register an exit handler per connection,
+    which would keep every replaced connection alive until the interpreter exits.
+
+    :param tmp_path: Temporary path provided for storing files during the test.
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    registered = []
+    monkeypatch.setattr(storage.atexit, "register", registered.append)
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        monkeypatch.chdir(tmp_path / name)
+        storage.get_connection()
+
+    assert registered == []
@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+from pytest_enhanced import utils
+
+
+def test_dumps_json_fallback_is_compact_utf8(monkeypatch):
+    """
+    Test that the standard library fallback of `dumps_json` writes compact JSON with
+    non-ASCII characters encoded as UTF-8 rather than escaped.
+
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    monkeypatch.setattr(utils, "orjson", None)
+    row = {"run_id": 1, "test_name": "t::ü", "duration": 0.25, "error_message": None}
+    assert utils.dumps_json(row) == (
+        '{"run_id":1,"test_name":"t::ü","duration":0.25,"error_message":null}'.encode("utf-8")
+    )
+
+
+def test_dumps_json_fallback_matches_orjson(monkeypatch):
+    """
+    Test that the standard library fallback of `dumps_json` produces exactly the
+    same bytes as the orjson path for a typical export row, and pin the documented
+    differences between the two for floats and non-string keys.
+
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    pytest.importorskip("orjson")
+    row = {"run_id": 1, "test_name": "t::ü", "duration": 0.25, "error_message": None}
+
+    fast = utils.dumps_json(row)
+    assert utils.dumps_json(1e16) == b"1e16"
+    with pytest.raises(TypeError):
+        utils.dumps_json({1: "a"})
+
+    monkeypatch.setattr(utils, "orjson", None)
+    assert utils.dumps_json(row) == fast
+    assert utils.dumps_json(1e16) == b"1e+16"
+    assert utils.dumps_json({1: "a"}) == b'{"1":"a"}'
+
+
+def test_utcnow_micros_is_integer_epoch_micros():
+    """
+    Test that `utcnow_micros` returns the current time as integer microseconds.
+    """
+    before = time.time()
+    value = utils.utcnow_micros()
+    assert isinstance(value, int)
+    assert abs(value / 1_000_000 - before) < 5
+
+
+def test_get_data_dir_follows_working_directory(tmp_path, monkeypatch):
+    """
+    Test that `get_data_dir` creates the data directory in the current working
+    directory and follows changes of the working directory despite its memo.
+    """
+    first = tmp_path / "a"
+    second = tmp_path / "b"
+    first.mkdir()
+    second.mkdir()
+
+    monkeypatch.chdir(first)
+    assert utils.get_data_dir() == first / ".pytest_enhanced"
+    assert utils.get_data_dir().is_dir()
+
+    monkeypatch.chdir(second)
+    assert utils.get_data_dir() == second / ".pytest_enhanced"
+    assert utils.get_data_dir().is_dir()
+
+
+def test_formatters():
+    """
+    Test the output of ``format_duration``, ``format_percent`` and ``safe_str``.
+
+    :return: None
+    """
+    assert utils.format_duration(1.234) == "1.23s"
+    assert utils.format_duration(0) == "0.00s"
+    assert utils.format_percent(87.25) == "87.2%"
+    assert utils.format_percent(None) == "N/A"
+    assert utils.safe_str(None) == ""
+    assert utils.safe_str("boom") == "boom"
@@ -0,0 +1,270 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+from fastapi import HTTPException
+
+from pytest_enhanced import storage
+from pytest_enhanced.web import api
+
+
+def _read_ndjson(response):
+    """
+    Collects the body of a streaming response and decodes it line by line.
+
+    :param response: The response returned by an endpoint.
+    :return: The decoded JSON objects, in order.
+    """
+    async def collect():
+        return b"".join([chunk async for chunk in response.body_iterator])
+
+    body = asyncio.run(collect())
+    return [json.loads(line) for line in body.splitlines()]
+
+
+def test_run_details_stream_ndjson(tmp_path, monkeypatch):
+    """
+    Test that `/runs` and `/runs/{run_id}` stream newline-delimited JSON in columnar
+    form: a header line naming the columns, then one array per row.
+
+    :param tmp_path: Temporary path provided for storing files during the test.
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+    run_id = storage.start_run()
+    storage.record_test_results([
+        (run_id, "t1", "passed", 0.2, None),
+        (run_id, "t2", "failed", 1.0, "bad"),
+    ])
+    storage.finish_run(run_id)
+
+    response = asyncio.run(api.get_run_details(run_id))
+    assert response.media_type == "application/x-ndjson"
+    lines = _read_ndjson(response)
+    assert lines[0] == {"run_id": run_id, "columns": list(storage.TEST_FIELDS)}
+    assert lines[1:] == [["t1", "passed", 0.2, None], ["t2", "failed", 1.0, "bad"]]
+
+    runs = _read_ndjson(asyncio.run(api.get_runs(limit=20)))
+    assert runs[0] == {"columns": list(storage.RUN_FIELDS)}
+    assert [dict(zip(runs[0]["columns"], row)) for row in runs[1:]] == storage.fetch_all_runs()
+
+
+def test_slowest_body_cached_until_new_results(tmp_path, monkeypatch):
+    """
+    Test that `/slow/{run_id}` serves a cached body while the database is unchanged
+    and a fresh one once new results are written.
+
+    :param tmp_path: Temporary path provided for storing files during the test.
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+    run_id = storage.start_run()
+    storage.record_test_results([(run_id, "t1", "passed", 0.2, None)])
+
+    first = asyncio.run(api.get_slowest(run_id))
+    hits = api._slowest_body.cache_info().hits
+    assert asyncio.run(api.get_slowest(run_id)).body == first.body
+    assert api._slowest_body.cache_info().hits == hits + 1
+    assert json.loads(first.body) == {"run_id": run_id, "slowest": [["t1", 0.2]]}
+
+    storage.record_test_results([(run_id, "t2", "failed", 1.0, "bad")])
+    body = json.loads(asyncio.run(api.get_slowest(run_id)).body)
+    assert body["slowest"] == [["t2", 1.0], ["t1", 0.2]]
+
+
+def test_default_response_class_renders_compact_json():
+    """
+    Test that the app's default response class renders endpoint return values with
+    ``dumps_json``, i.e. as compact UTF-8 JSON.
+
+    :return: None
+    """
+    assert api.app.router.default_response_class is api.FastJSONResponse
+    response = api.FastJSONResponse(asyncio.run(api.index()))
+    assert response.body == '{"message":"Pytest Enhanced API is running 🚀"}'.encode("utf-8")
+    assert response.media_type == "application/json"
+
+
+def test_flaky_endpoint(tmp_path, monkeypatch):
+    """
+    Test that `/flaky` lists a test that failed twice, with the database work done
+    in the threadpool of the async endpoint.
+
+    :param tmp_path: Temporary path provided for storing files during the test.
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+    for status in ("failed", "passed", "failed"):
+        run_id = storage.start_run()
+        storage.record_test_results([(run_id, "t_flaky", status, 0.1, None)])
+        storage.finish_run(run_id)
+
+    body = json.loads(asyncio.run(api.get_flaky()).body)
+    assert [row[0] for row in body["flaky"]] == ["t_flaky"]
+
+
+def test_run_details_include(tmp_path, monkeypatch):
+    """
+    Test that `/runs/{run_id}?include=slow,flaky` adds the slowest and flaky views
+    to the header line and rejects unknown sections.
+
+    :param tmp_path: Temporary path provided for storing files during the test.
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+    run_id = storage.start_run()
+    storage.record_test_results([
+        (run_id, "t1", "passed", 0.2, None),
+        (run_id, "t2", "failed", 1.0, "bad"),
+    ])
+    storage.finish_run(run_id)
+
+    lines = _read_ndjson(asyncio.run(api.get_run_details(run_id, include="slow,flaky")))
+    assert lines[0]["slowest"] == [["t2", 1.0], ["t1", 0.2]]
+    assert lines[0]["flaky"] == []
+    assert len(lines) == 3
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(api.get_run_details(run_id, include="slow,bogus"))
+    assert excinfo.value.status_code == 400
+
+
+def test_flaky_endpoint_reads_finished_runs_only(tmp_path, monkeypatch):
+    """
+    Test that `/flaky` is served from the precomputed `test_stats` table: failures
+    of a run still in progress show up once the run is finished.
+
+    :param tmp_path: Temporary path provided for storing files during the test.
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+    run_id = storage.start_run()
+    storage.record_test_results([(run_id, "t_flaky", "failed", 0.1, None)])
+    storage.finish_run(run_id)
+    run_id = storage.start_run()
+    storage.record_test_results([(run_id, "t_flaky", "failed", 0.1, None)])
+
+    assert json.loads(asyncio.run(api.get_flaky()).body) == {"flaky": []}
+    storage.finish_run(run_id)
+    assert json.loads(asyncio.run(api.get_flaky()).body)["flaky"] == [["t_flaky", 2, 2, 0, 100.0]]
+
+
+def test_etag_not_modified(tmp_path, monkeypatch):
+    """
+    Test that the data endpoints send an ETag, answer a matching `If-None-Match`
+    with an empty 304, and change the tag once new results are written.
+
+    :param tmp_path: Temporary path provided for storing files during the test.
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+    run_id = storage.start_run()
+    storage.record_test_results([(run_id, "t1", "passed", 0.2, None)])
+
+    first = asyncio.run(api.get_slowest(run_id))
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+    assert asyncio.run(api.get_runs(limit=20)).headers["etag"] == etag
+
+    cached = asyncio.run(api.get_slowest(run_id, if_none_match=etag))
+    assert cached.status_code == 304
+    assert cached.body == b""
+    assert asyncio.run(api.get_flaky(if_none_match=f'"other", {etag}')).status_code == 304
+
+    storage.record_test_results([(run_id, "t2", "failed", 1.0, "bad")])
+    fresh = asyncio.run(api.get_runs(limit=20, if_none_match=etag))
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+
+
+def test_lifespan_prepares_database(tmp_path, monkeypatch):
+    """
+    Test that starting the app creates the database schema before any request.
+
+    :param tmp_path: Temporary path provided for storing files during the test.
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+
+    async def start():
+        async with api.lifespan(api.app):
+            pass
+
+    asyncio.run(start())
+    version = storage.get_connection().execute("PRAGMA user_version").fetchone()[0]
+    assert version == storage.SCHEMA_VERSION
+
+
+def test_etag_changes_when_empty_run_finishes(tmp_path, monkeypatch):
+    """
+    Test that finishing a run without results changes the ETag of `/runs`, so a
+    client holding the listing from before the finish does not get a 304.
+
+    :param tmp_path: Temporary path provided for storing files during the test.
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+    run_id = storage.start_run()
+    etag = asyncio.run(api.get_runs(limit=20)).headers["etag"]
+
+    storage.finish_run(run_id)
+    response = asyncio.run(api.get_runs(limit=20, if_none_match=etag))
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_streams_use_their_own_connection(tmp_path, monkeypatch):
+    """
+    Test that the streaming endpoints read through a connection of their own, not
+    the cached connection of a threadpool thread, and close it once the stream ends.
+
+    :param tmp_path: Temporary path provided for storing files during the test.
+    :param monkeypatch: A fixture provided by pytest to safely modify and
+        restore attributes and environment behaviors during the test.
+    :return: None
+    """
+    monkeypatch.chdir(tmp_path)
+    storage.ensure_db()
+    run_id = storage.start_run()
+    storage.record_test_results([(run_id, "t1", "passed", 0.2, None)])
+
+    opened = []
+
+    def open_connection():
+        conn = storage.open_connection()
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(api, "open_connection", open_connection)
+    assert len(_read_ndjson(asyncio.run(api.get_runs(limit=20)))) == 2
+    assert len(_read_ndjson(asyncio.run(api.get_run_details(run_id)))) == 2
+
+    assert len(opened) == 2
+    for conn in opened:
+        assert conn is not storage.get_connection()
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")